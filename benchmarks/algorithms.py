@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+
+from __future__ import print_function
+from collections import OrderedDict
+import os
+import sys
+import tempfile
+import time
+
+# Python hack to allow for our folder structure
+from sys import path
+from os.path import dirname
+path.append(dirname(path[0]))
+# End hack
+
+from Crypto.PublicKey import ECC, RSA
+
+from mockservice import MockService
+from verylargebits.client import Client, SignatureAuthClient
+from verylargebits.signing import export_key
+
+"""This benchmark (algorithms.py) compares the cost of Signature Authorization headers
+across key types, and checks every header it benchmarks against the mock verifier of
+mockservice.py so that a fast but wrong signature cannot pass."""
+
+DURATION_DEFAULT = 3.0
+VERIFIED_REQUESTS = 20
+
+# Key types to compare and how to generate them
+KEYS = OrderedDict([
+    ('rsa-2048', lambda: RSA.generate(2048)),
+    ('rsa-4096', lambda: RSA.generate(4096)),
+    ('ed25519', lambda: ECC.generate(curve='ed25519')),
+    ('ecdsa-p256', lambda: ECC.generate(curve='P-256')),
+])
+
+def print_help():
+    """Prints out the details of command line usage of this program"""
+
+    print("""Usage: python algorithms.py [OPTION]...
+Measures Signature Authorization headers per second for each key type. Examples:
+    python algorithms.py
+    python algorithms.py --duration 10
+
+OPTIONs:
+    -d or --duration  Seconds to run each measurement (default 3).
+    -h or --help      Print this message.""")
+    sys.exit()
+
+def write_key(private_key):
+    """Writes the given key to a temporary PEM file and returns the filename"""
+
+    data = export_key(private_key)
+    file_, filename = tempfile.mkstemp(suffix='.pem')
+    os.write(file_, data if isinstance(data, bytes) else data.encode('ascii'))
+    os.close(file_)
+
+    return filename
+
+def measure(auth_impl, duration):
+    """Returns the Authorization headers per second auth_impl computes"""
+
+    count = 0
+    deadline = time.time() + duration
+    start = time.time()
+    while time.time() < deadline:
+        auth_impl.auth_value_iter('PATCH', '/asset/l3pgbkpbcm5l41kt4tdgf2x4jq/1', [b'x' * 1024])
+        count += 1
+
+    return count / (time.time() - start)
+
+def verify(api_key, private_key, key_filename):
+    """Returns True if the mock verifier accepts every request signed with private_key"""
+
+    public_key = export_key(private_key.public_key())
+    with MockService(public_keys={api_key: public_key}) as service:
+        with Client.from_sig_auth(api_key, key_filename, service_url=service.url) as client:
+            statuses = [client.patch_asset('l3pgbkpbcm5l41kt4tdgf2x4jq', index, b'x' * 1024)
+                        .status_code for index in range(VERIFIED_REQUESTS)]
+
+    return statuses == [200] * VERIFIED_REQUESTS
+
+def main():
+    """Entry point for algorithms benchmark."""
+
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print_help()
+
+    if '-d' in sys.argv:
+        duration = float(sys.argv[sys.argv.index('-d') + 1])
+    elif '--duration' in sys.argv:
+        duration = float(sys.argv[sys.argv.index('--duration') + 1])
+    else:
+        duration = DURATION_DEFAULT
+
+    failed = False
+    baseline = None
+    for name, generate in KEYS.items():
+        private_key = generate()
+        key_filename = write_key(private_key)
+        try:
+            auth_impl = SignatureAuthClient('0gjv9kpbct9w68809r6jh5ppgb', key_filename)
+            rate = measure(auth_impl, duration)
+            verified = verify('0gjv9kpbct9w68809r6jh5ppgb', private_key, key_filename)
+        finally:
+            os.remove(key_filename)
+
+        baseline = baseline or rate
+        failed = failed or not verified
+        print('%-12s %10.1f headers/s  %6.1fx rsa-2048  %s'
+              % (name, rate, rate / baseline, 'verified' if verified else 'REJECTED'))
+
+    if failed:
+        sys.exit(1)
+
+main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from __future__ import print_function
+import base64
+import hashlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Python hack to allow for our folder structure
+from sys import path
+from os.path import dirname
+path.append(dirname(path[0]))
+# End hack
+
+from verylargebits.hashing import calc_sha1, calc_sha1s
+
+"""This benchmark (hashing.py) measures the GB/s of file hashing, for one file and for
+many files hashed at once on threads and processes, and the GB/s per core used."""
+
+FILE_SIZE_DEFAULT = 256 * 1024 * 1024
+LEGACY_READ_SIZE = 65536
+
+def print_help():
+    """Prints out the details of command line usage of this program"""
+
+    print("""Usage: python hashing.py [OPTION]...
+Measures SHA1 hashing throughput of the hashing engine. Files are read once before
+measuring, so the figures are for the page cache rather than the disk. Examples:
+    python hashing.py
+    python hashing.py --size 1024 --files 8
+
+OPTIONs:
+    -s or --size   Megabytes in each test file (default 256).
+    -f or --files  Number of test files (default: twice the number of cores).
+    -h or --help   Print this message.""")
+    sys.exit()
+
+def legacy_sha1(filename):
+    """The previous calc_sha1: 64KB buffered reads on one thread"""
+
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as file_:
+        while True:
+            data = file_.read(LEGACY_READ_SIZE)
+            if not data:
+                break
+
+            sha1.update(data)
+
+    return base64.urlsafe_b64encode(sha1.digest()).decode('utf-8')
+
+def measure(name, cores, total_bytes, function, *args, **kwargs):
+    """Prints the GB/s of one call to function and the GB/s per core it used"""
+
+    start = time.time()
+    function(*args, **kwargs)
+    rate = total_bytes / (time.time() - start) / 1e9
+    print('%-28s %8.2f GB/s  %8.2f GB/s/core' % (name, rate, rate / cores))
+
+def main():
+    """Entry point for hashing benchmark."""
+
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print_help()
+
+    cores = multiprocessing.cpu_count()
+    if '-s' in sys.argv:
+        file_size = int(sys.argv[sys.argv.index('-s') + 1]) * 1024 * 1024
+    elif '--size' in sys.argv:
+        file_size = int(sys.argv[sys.argv.index('--size') + 1]) * 1024 * 1024
+    else:
+        file_size = FILE_SIZE_DEFAULT
+
+    if '-f' in sys.argv:
+        file_count = int(sys.argv[sys.argv.index('-f') + 1])
+    elif '--files' in sys.argv:
+        file_count = int(sys.argv[sys.argv.index('--files') + 1])
+    else:
+        file_count = cores * 2
+
+    directory = tempfile.mkdtemp()
+    try:
+        filenames = []
+        block = os.urandom(1024 * 1024)
+        for index in range(file_count):
+            filename = os.path.join(directory, '%d.bin' % index)
+            with open(filename, 'wb') as file_:
+                for _ in range(file_size // len(block)):
+                    file_.write(block)
+
+            filenames.append(filename)
+
+        # Warm the page cache and check the engine agrees with the previous hash
+        if calc_sha1(filenames[0]) != legacy_sha1(filenames[0]):
+            raise AssertionError('calc_sha1 does not match the previous hash')
+
+        calc_sha1s(filenames)
+
+        print('Cores: %d  Files: %d x %dMB' % (cores, file_count, file_size // 2 ** 20))
+        measure('legacy 64KB, 1 file', 1, file_size, legacy_sha1, filenames[0])
+        measure('calc_sha1, 1 file', 1, file_size, calc_sha1, filenames[0])
+
+        total_bytes = file_size * file_count
+        workers = 1
+        while True:
+            used = min(workers, cores)
+            measure('threads=%d, %d files' % (workers, file_count), used, total_bytes,
+                    calc_sha1s, filenames, max_workers=workers)
+            measure('processes=%d, %d files' % (workers, file_count), used, total_bytes,
+                    calc_sha1s, filenames, max_workers=workers, processes=True)
+
+            if workers >= cores:
+                break
+
+            workers = min(cores, workers * 2)
+    finally:
+        shutil.rmtree(directory)
+
+main()
@@ -0,0 +1,160 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+
+import base64
+import json
+import multiprocessing
+import sys
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import DSS, PKCS1_v1_5, eddsa
+
+if sys.version_info[0] < 3:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+else:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+"""A local mock of the Very Large Bits API for the benchmarks. It answers every
+endpoint the client calls with a minimal valid response, reads and discards request
+bodies, and runs in its own process so that its CPU and memory use are not measured.
+Given public keys by API key, it also verifies Signature Authorization headers as
+the service does and answers 401 to any request whose signature does not verify."""
+
+READ_SIZE = 1024 * 1024
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+def import_public_key(key_data):
+    """Returns the RSA or elliptic curve public key in key_data"""
+
+    try:
+        return RSA.importKey(key_data)
+    except ValueError:
+        return ECC.import_key(key_data)
+
+def verify_signature(header, digest, public_keys):
+    """Returns True if header is a valid Signature of the SHA256 hash object digest"""
+
+    try:
+        scheme, credentials = header.split(' ', 1)
+        api_key, algorithm, signature = credentials.split(':')
+        public_key = public_keys[api_key]
+        signature = base64.b64decode(signature)
+        if scheme != 'Signature':
+            return False
+
+        if algorithm == 'SHA256':
+            return PKCS1_v1_5.new(public_key).verify(digest, signature)
+
+        if algorithm == 'ED25519-SHA256':
+            eddsa.new(public_key, 'rfc8032').verify(digest.digest(), signature)
+        elif algorithm == 'ECDSA-SHA256':
+            DSS.new(public_key, 'fips-186-3').verify(digest, signature)
+        else:
+            return False
+    except (KeyError, TypeError, ValueError):
+        return False
+
+    return True
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; Nagle would hold the body back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.startswith('/render/'):
+            self.answer({'id': self.path.split('/')[2], 'status': 'DONE'})
+        else:
+            self.answer({'id': 'l3pgbkpbcm5l41kt4tdgf2x4jq', 'status': 'USABLE'})
+
+    def do_PATCH(self):
+        self.answer({})
+
+    def do_POST(self):
+        self.answer({'id': '6nnrqkpbffq8ke6y7rh6trccz5'})
+
+    def answer(self, value):
+        public_keys = self.server.public_keys
+        digest = None
+        if public_keys:
+            digest = SHA256.new((self.command + self.path).encode('utf-8'))
+
+        remaining = int(self.headers.get('Content-Length') or 0)
+        while remaining > 0:
+            chunk = self.rfile.read(min(READ_SIZE, remaining))
+            remaining -= len(chunk)
+            if digest is not None:
+                digest.update(chunk)
+
+        if digest is not None and not verify_signature(self.headers.get('Authorization', ''),
+                                                       digest, public_keys):
+            self.reply(401, {})
+        else:
+            self.reply(200, value)
+
+    def reply(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def _serve(ports, public_keys):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockRequestHandler)
+    server.public_keys = dict((api_key, import_public_key(key_data))
+                              for api_key, key_data in public_keys.items())
+    ports.put(server.server_address[1])
+    server.serve_forever()
+
+class MockService(object):
+    """Runs the mock API in a child process until stop() is called
+
+    public_keys optionally maps API keys to PEM public keys to verify signatures with."""
+
+    def __init__(self, public_keys=None):
+        ports = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=_serve, args=(ports, public_keys or {}))
+        self.process.daemon = True
+        self.process.start()
+        self.url = 'http://127.0.0.1:%d' % ports.get(timeout=30)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
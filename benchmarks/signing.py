@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from __future__ import print_function
+import multiprocessing
+import sys
+import threading
+import time
+
+# Python hack to allow for our folder structure
+from sys import path
+from os.path import dirname
+path.append(dirname(path[0]))
+# End hack
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import RSA
+
+from verylargebits.signing import LocalSigner, ProcessPoolSigner
+
+"""This benchmark (signing.py) measures how many request signatures per second the
+signing backends produce, and how the process pool backend scales with cores."""
+
+DURATION_DEFAULT = 3.0
+KEY_BITS_DEFAULT = 2048
+
+def print_help():
+    """Prints out the details of command line usage of this program"""
+
+    print("""Usage: python signing.py [OPTION]...
+Measures RSA PKCS#1 v1.5 signatures per second for each signing backend. Examples:
+    python signing.py
+    python signing.py --duration 10 --secret mykeyfile.pkcs8
+
+OPTIONs:
+    -d or --duration  Seconds to run each measurement (default 3).
+    -s or --secret    Private key file to sign with (default: a new 2048 bit key).
+    -h or --help      Print this message.""")
+    sys.exit()
+
+def measure(signer, threads, duration):
+    """Returns the signatures per second of signer when called from threads threads"""
+
+    digest = SHA256.new(b'POST/render{"src": "6nnrqkpbffq8ke6y7rh6trccz5"}')
+    counts = [0] * threads
+    deadline = time.time() + duration
+
+    def run(index):
+        while time.time() < deadline:
+            signer.sign(digest)
+            counts[index] += 1
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    return sum(counts) / (time.time() - start)
+
+def main():
+    """Entry point for signing benchmark."""
+
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print_help()
+
+    if '-d' in sys.argv:
+        duration = float(sys.argv[sys.argv.index('-d') + 1])
+    elif '--duration' in sys.argv:
+        duration = float(sys.argv[sys.argv.index('--duration') + 1])
+    else:
+        duration = DURATION_DEFAULT
+
+    if '-s' in sys.argv:
+        private_key = RSA.importKey(open(sys.argv[sys.argv.index('-s') + 1], 'r').read())
+    elif '--secret' in sys.argv:
+        private_key = RSA.importKey(open(sys.argv[sys.argv.index('--secret') + 1], 'r').read())
+    else:
+        private_key = RSA.generate(KEY_BITS_DEFAULT)
+
+    cores = multiprocessing.cpu_count()
+    print('Cores: %d' % cores)
+
+    local = LocalSigner(private_key)
+    print('local  threads=%-3d %10.1f sig/s' % (1, measure(local, 1, duration)))
+    print('local  threads=%-3d %10.1f sig/s' % (cores * 2, measure(local, cores * 2, duration)))
+
+    processes = 1
+    while True:
+        pool = ProcessPoolSigner(private_key, processes=processes)
+        pool.sign(SHA256.new())  # Start the workers outside of the measurement
+        rate = measure(pool, processes * 2, duration)
+        pool.close()
+        print('pool   processes=%-3d %8.1f sig/s  %8.1f sig/s/process'
+              % (processes, rate, rate / processes))
+
+        if processes >= cores:
+            break
+
+        processes = min(cores, processes * 2)
+
+main()
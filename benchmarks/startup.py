@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+
+from __future__ import print_function
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Python hack to allow for our folder structure
+from sys import path
+from os.path import dirname
+path.append(dirname(path[0]))
+# End hack
+
+from Crypto.PublicKey import RSA
+
+from mockservice import MockService
+
+"""This benchmark (startup.py) measures what a short-lived process pays to use the
+client: the time to import verylargebits.client and the latency of the first request
+with each auth provider, each in a fresh interpreter. Medians over several runs are
+checked against budgets; exceeding any budget, or loading pycryptodome for a basic
+auth request, fails the run."""
+
+RUNS_DEFAULT = 10
+KEY_BITS_DEFAULT = 2048
+
+# Budgets in milliseconds
+BUDGETS_DEFAULT = {
+    'import': 100.0,
+    'first_request_basic': 150.0,
+    'first_request_signature': 250.0,
+}
+
+# Runs in a fresh interpreter; argv is the root folder, service url and key file
+_PROBE = '''
+import json, sys, time
+sys.path.insert(0, sys.argv[1])
+start = time.time()
+import verylargebits.client
+imported = time.time()
+if sys.argv[3] == '-':
+    client = verylargebits.client.Client.from_basic_auth('bench@example.com', 'password',
+                                                         service_url=sys.argv[2])
+else:
+    client = verylargebits.client.Client.from_sig_auth('0gjv9kpbct9w68809r6jh5ppgb',
+                                                       sys.argv[3], service_url=sys.argv[2])
+client.get_asset_status('l3pgbkpbcm5l41kt4tdgf2x4jq')
+print(json.dumps({'import': (imported - start) * 1000,
+                  'first_request': (time.time() - imported) * 1000,
+                  'crypto_loaded': 'Crypto' in sys.modules}))
+'''
+
+def print_help():
+    """Prints out the details of command line usage of this program"""
+
+    print("""Usage: python startup.py [OPTION]...
+Measures import time and first request latency in fresh interpreters. Examples:
+    python startup.py
+    python startup.py --runs 20 --budget-import 50
+
+OPTIONs:
+    -r or --runs                Fresh interpreters started per measurement (default 10).
+    --budget-import             Budget for importing the client in ms (default 100).
+    --budget-basic              Budget for the first basic auth request in ms (default 150).
+    --budget-signature          Budget for the first signed request in ms (default 250).
+    -o or --output              Write the medians and budgets to this JSON file.
+    -s or --secret              Private key file to sign with (default: a new key).
+    -h or --help                Print this message.""")
+    sys.exit()
+
+def option(short, long_, default, convert=str):
+    """Returns the value following a command line switch, or default"""
+
+    for name in (short, long_):
+        if name is not None and name in sys.argv:
+            return convert(sys.argv[sys.argv.index(name) + 1])
+
+    return default
+
+def median(samples):
+    ordered = sorted(samples)
+
+    return ordered[len(ordered) // 2]
+
+def probe(url, key_filename, runs):
+    """Returns the results of runs fresh interpreters making one request each"""
+
+    root = dirname(dirname(os.path.abspath(__file__)))
+    results = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, '-c', _PROBE, root, url,
+                                          key_filename or '-'])
+        results.append(json.loads(output.decode('utf-8')))
+
+    return results
+
+def main():
+    """Entry point for startup benchmark."""
+
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print_help()
+
+    runs = option('-r', '--runs', RUNS_DEFAULT, int)
+    output = option('-o', '--output', None)
+    budgets = {
+        'import': option(None, '--budget-import', BUDGETS_DEFAULT['import'], float),
+        'first_request_basic': option(None, '--budget-basic',
+                                      BUDGETS_DEFAULT['first_request_basic'], float),
+        'first_request_signature': option(None, '--budget-signature',
+                                          BUDGETS_DEFAULT['first_request_signature'], float),
+    }
+
+    key_filename = option('-s', '--secret', None)
+    temp_key = key_filename is None
+    if temp_key:
+        file_, key_filename = tempfile.mkstemp(suffix='.pem')
+        os.write(file_, RSA.generate(KEY_BITS_DEFAULT).exportKey('PEM'))
+        os.close(file_)
+
+    try:
+        with MockService() as service:
+            basic = probe(service.url, None, runs)
+            signature = probe(service.url, key_filename, runs)
+    finally:
+        if temp_key:
+            os.remove(key_filename)
+
+    medians = {
+        'import': median([result['import'] for result in basic + signature]),
+        'first_request_basic': median([result['first_request'] for result in basic]),
+        'first_request_signature': median([result['first_request'] for result in signature]),
+    }
+
+    failures = []
+    for name in sorted(medians):
+        over = medians[name] > budgets[name]
+        print('%-28s %8.1f ms  budget %8.1f ms%s'
+              % (name, medians[name], budgets[name], '  OVER BUDGET' if over else ''))
+        if over:
+            failures.append(name)
+
+    if any(result['crypto_loaded'] for result in basic):
+        print('pycryptodome was loaded by a basic auth request')
+        failures.append('crypto_loaded')
+
+    if output is not None:
+        with open(output, 'w') as file_:
+            json.dump({'medians': medians, 'budgets': budgets, 'failures': failures}, file_,
+                      indent=2)
+
+    if failures:
+        sys.exit(1)
+
+main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+
+from __future__ import print_function
+from collections import OrderedDict
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Python hack to allow for our folder structure
+from sys import path
+from os.path import dirname
+path.append(dirname(path[0]))
+# End hack
+
+from Crypto.PublicKey import RSA
+
+from mockservice import MockService
+from verylargebits.client import BasicAuthClient, Client, SignatureAuthClient
+from verylargebits.hashing import calc_sha1
+
+"""This benchmark suite (suite.py) measures the client hot paths against a local mock
+of the API: request throughput and latency percentiles per endpoint, Authorization
+header cost per auth provider, and upload goodput and peak memory across patch sizes
+and concurrency levels. Results are written as JSON and compared with a baseline
+written by an earlier run; any regression beyond the tolerance fails the run."""
+
+DURATION_DEFAULT = 2.0
+THREADS_DEFAULT = 8
+TOLERANCE_DEFAULT = 0.2
+KEY_BITS_DEFAULT = 2048
+UPLOAD_SIZE_DEFAULT = 64 * 1024 * 1024
+PATCH_SIZES = [256 * 1024, 1024 * 1024, 4 * 1024 * 1024]
+CONCURRENCY_LEVELS = [1, 4, 8]
+PERCENTILES = [50, 90, 99]
+
+# Runs one upload in a fresh interpreter and prints how far it raised the peak resident
+# size; argv is the root folder, service url, file, SHA1, patch size and concurrency
+_UPLOAD_PROBE = '''
+import json, resource, sys
+sys.path.insert(0, sys.argv[1])
+from verylargebits.client import Client
+
+def peak_rss():
+    # Linux keeps ru_maxrss across exec(), so it may be the parent's; VmHWM is our own
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        pass
+    # Bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+with Client.from_basic_auth('bench@example.com', 'password', service_url=sys.argv[2],
+                            pool_maxsize=int(sys.argv[6])) as client:
+    client.get_asset_status(sys.argv[4])
+    before = peak_rss()
+    client.upload_file(sys.argv[3], patch_size=int(sys.argv[5]),
+                       max_in_flight=int(sys.argv[6]), sha1=sys.argv[4])
+    print(json.dumps({'peak_rss': peak_rss() - before}))
+'''
+
+# Request bodies of typical sizes
+PATCH_BODY = os.urandom(64 * 1024)
+AUTH_BODY = os.urandom(1024 * 1024)
+TEMPLATE = {'layers': [{'type': 'video', 'src': 'l3pgbkpbcm5l41kt4tdgf2x4jq'}] * 20}
+VARS = {'title': 'Benchmark', 'items': list(range(100))}
+
+def print_help():
+    """Prints out the details of command line usage of this program"""
+
+    print("""Usage: python suite.py [OPTION]...
+Benchmarks the client against a local mock of the API. Examples:
+    python suite.py
+    python suite.py --output baseline.json
+    python suite.py --baseline baseline.json --tolerance 0.1
+
+OPTIONs:
+    -d or --duration  Seconds to run each throughput measurement (default 2).
+    -t or --threads   Threads sending requests at once (default 8).
+    -o or --output    Write the results to this JSON file, e.g. to keep as a baseline.
+    -b or --baseline  Compare with the results of an earlier run; exits with status 1
+                      if any result is worse than the baseline by more than tolerance.
+    --tolerance       The allowed fraction of regression (default 0.2).
+    --upload-size     Bytes uploaded per upload measurement (default 64MB).
+    -s or --secret    Private key file to sign with (default: a new 2048 bit key).
+    -h or --help      Print this message.""")
+    sys.exit()
+
+def option(short, long_, default, convert=str):
+    """Returns the value following a command line switch, or default"""
+
+    for name in (short, long_):
+        if name is not None and name in sys.argv:
+            return convert(sys.argv[sys.argv.index(name) + 1])
+
+    return default
+
+def percentile(samples, pct):
+    """Returns the pct percentile of the given samples (nearest rank)"""
+
+    ordered = sorted(samples)
+
+    return ordered[int(round(pct / 100.0 * (len(ordered) - 1)))]
+
+class Results(object):
+    """Named measurements, each with a unit and whether higher or lower is better"""
+
+    def __init__(self):
+        self.metrics = OrderedDict()
+
+    def add(self, name, value, unit, better='higher'):
+        self.metrics[name] = {'value': value, 'unit': unit, 'better': better}
+        print('%-48s %14.2f %s' % (name, value, unit))
+
+    def write(self, filename):
+        with open(filename, 'w') as file_:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'metrics': self.metrics,
+            }, file_, indent=2)
+
+    def regressions(self, baseline, tolerance):
+        """Returns a description of each metric worse than baseline by over tolerance"""
+
+        regressions = []
+        for name, metric in self.metrics.items():
+            expected = baseline.get('metrics', {}).get(name)
+            if expected is None or not expected['value']:
+                continue
+
+            change = (metric['value'] - expected['value']) / float(expected['value'])
+            if metric['better'] == 'lower':
+                change = -change
+
+            if change < -tolerance:
+                regressions.append('%s: %.2f %s (baseline %.2f, %+.0f%%)'
+                                   % (name, metric['value'], metric['unit'],
+                                      expected['value'], change * 100))
+
+        return regressions
+
+def measure_calls(call, threads, duration):
+    """Returns the calls per second of call from threads threads, and every latency"""
+
+    latencies = [[] for _ in range(threads)]
+    deadline = time.time() + duration
+
+    def run(index):
+        while time.time() < deadline:
+            start = time.time()
+            call()
+            latencies[index].append(time.time() - start)
+
+    workers = [threading.Thread(target=run, args=(index,)) for index in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    samples = [latency for worker_latencies in latencies for latency in worker_latencies]
+
+    return len(samples) / (time.time() - start), samples
+
+def bench_endpoints(results, url, threads, duration):
+    """Measures the requests per second and latency percentiles of each endpoint"""
+
+    with Client.from_basic_auth('bench@example.com', 'password', service_url=url,
+                                pool_maxsize=threads) as client:
+        asset_id = 'l3pgbkpbcm5l41kt4tdgf2x4jq'
+        render_id = '6nnrqkpbffq8ke6y7rh6trccz5'
+        endpoints = OrderedDict([
+            ('get_asset_status', lambda: client.get_asset_status(asset_id)),
+            ('get_render_status', lambda: client.get_render_status(render_id)),
+            ('patch_asset', lambda: client.patch_asset(asset_id, 1, PATCH_BODY)),
+            ('post_render', lambda: client.post_render(render_id, vars_=VARS)),
+            ('post_template', lambda: client.post_template(TEMPLATE)),
+        ])
+
+        for name, call in endpoints.items():
+            call()  # Open the connections outside of the measurement
+            rate, latencies = measure_calls(call, threads, duration)
+            results.add('%s.throughput' % name, rate, 'req/s')
+            for pct in PERCENTILES:
+                results.add('%s.latency_p%d' % (name, pct),
+                            percentile(latencies, pct) * 1000, 'ms', better='lower')
+
+def bench_auth(results, key_filename, duration):
+    """Measures the Authorization headers per second of each auth provider"""
+
+    providers = OrderedDict([
+        ('basic', BasicAuthClient('bench@example.com', 'password')),
+        ('signature', SignatureAuthClient('0gjv9kpbct9w68809r6jh5ppgb', key_filename)),
+    ])
+
+    for name, provider in providers.items():
+        for body_name, chunks in (('empty', None), ('1mb', [AUTH_BODY])):
+            rate, _ = measure_calls(lambda: provider.auth_value_iter('PATCH', '/asset/a/1',
+                                                                     chunks), 1, duration)
+            results.add('auth.%s.%s' % (name, body_name), rate, 'headers/s')
+
+def bench_uploads(results, url, upload_size):
+    """Measures upload goodput and peak resident memory per patch size and concurrency
+
+    Memory is the growth of the peak resident size of a fresh process over the upload.
+    Unlike allocation tracing, this counts the mapped file pages that patches are read
+    from."""
+
+    try:
+        import resource
+    except ImportError:
+        # getrusage() is POSIX only
+        resource = None
+
+    root = dirname(dirname(os.path.abspath(__file__)))
+
+    file_, filename = tempfile.mkstemp(suffix='.bin')
+    try:
+        remaining = upload_size
+        while remaining > 0:
+            remaining -= os.write(file_, os.urandom(min(remaining, 1024 * 1024)))
+
+        os.close(file_)
+        sha1 = calc_sha1(filename)
+
+        for patch_size in PATCH_SIZES:
+            for max_in_flight in CONCURRENCY_LEVELS:
+                name = 'upload.%dk.x%d' % (patch_size // 1024, max_in_flight)
+                with Client.from_basic_auth('bench@example.com', 'password',
+                                            service_url=url,
+                                            pool_maxsize=max_in_flight) as client:
+                    start = time.time()
+                    client.upload_file(filename, patch_size=patch_size,
+                                       max_in_flight=max_in_flight, sha1=sha1)
+                    results.add(name + '.goodput',
+                                upload_size / (time.time() - start) / (1024 * 1024), 'MB/s')
+
+                if resource is not None:
+                    output = subprocess.check_output([sys.executable, '-c', _UPLOAD_PROBE,
+                                                      root, url, filename, sha1,
+                                                      str(patch_size), str(max_in_flight)])
+                    peak = json.loads(output.decode('utf-8'))['peak_rss']
+                    results.add(name + '.peak_rss', peak / (1024.0 * 1024.0), 'MB',
+                                better='lower')
+    finally:
+        os.remove(filename)
+
+def main():
+    """Entry point for the benchmark suite."""
+
+    if '-h' in sys.argv or '--help' in sys.argv:
+        print_help()
+
+    duration = option('-d', '--duration', DURATION_DEFAULT, float)
+    threads = option('-t', '--threads', THREADS_DEFAULT, int)
+    output = option('-o', '--output', None)
+    baseline = option('-b', '--baseline', None)
+    tolerance = option(None, '--tolerance', TOLERANCE_DEFAULT, float)
+    upload_size = option(None, '--upload-size', UPLOAD_SIZE_DEFAULT, int)
+
+    key_filename = option('-s', '--secret', None)
+    temp_key = key_filename is None
+    if temp_key:
+        file_, key_filename = tempfile.mkstemp(suffix='.pem')
+        os.write(file_, RSA.generate(KEY_BITS_DEFAULT).exportKey('PEM'))
+        os.close(file_)
+
+    results = Results()
+    try:
+        with MockService() as service:
+            bench_endpoints(results, service.url, threads, duration)
+            bench_auth(results, key_filename, duration)
+            bench_uploads(results, service.url, upload_size)
+    finally:
+        if temp_key:
+            os.remove(key_filename)
+
+    if output is not None:
+        results.write(output)
+
+    if baseline is not None:
+        with open(baseline) as file_:
+            regressions = results.regressions(json.load(file_), tolerance)
+
+        if regressions:
+            print('\nRegressions beyond %.0f%%:' % (tolerance * 100))
+            for regression in regressions:
+                print('    ' + regression)
+
+            sys.exit(1)
+
+        print('\nNo regressions beyond %.0f%%' % (tolerance * 100))
+
+main()
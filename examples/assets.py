@@ -23,12 +23,14 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
 
 from __future__ import print_function
-import base64
-import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import glob
 import json
-import math
+import os
 from os.path import getsize
 import sys
+import threading
+import time
 
 # Python hack to allow for our folder structure
 from sys import path
@@ -38,34 +40,35 @@ import verylargebits
 # End hack
 
 from verylargebits.client import Client
+from verylargebits.hashing import calc_sha1, calc_sha1s, hash_workers_default
+from verylargebits.index import AssetIndex
+from verylargebits.journal import UploadJournal
+from verylargebits.tuning import AUTO, ThroughputHistory
+from verylargebits.upload import MAX_IN_FLIGHT_DEFAULT, UploadError
 
 """This sample program (assets.py) demonstrates how to upload and check
 the status of asset files using the Very Large Bits SDK for Python."""
 
+# Ingest defaults
+MEMORY_BUDGET_DEFAULT = '256MB'
+
+# Options followed by a value; every other argument not starting with - is a FILE
+VALUE_OPTIONS = ('-c', '--concurrency', '-e', '--email', '--hash-workers', '--history', '-i',
+                 '--index', '-j', '--journal', '-k', '--key', '--manifest', '--memory', '-p',
+                 '--password', '--patch-size', '-s', '--secret', '-w', '--wait')
+
 # Configuration file keys and defaults
 API_KEY = 'api-key'
 EMAIL = 'email'
+HISTORY = 'history-filename'
+INDEX = 'index-filename'
+JOURNAL = 'journal-directory'
 PASSWORD = 'password'
 PATCH_SIZE = 'patch-size'
 PATCH_SIZE_DEFAULT = '4MB'
 PRIVATE_KEY = 'private-key-filename'
 SERVICE_URL = 'service-url'
 
-def calc_sha1(filename):
-    """Calculates and returns the base64 encoded SHA1 hash of a file"""
-
-    sha1 = hashlib.sha1()
-
-    with open(filename, 'rb') as file_:
-        while True:
-            data = file_.read(65536)
-            if not data:
-                break
-
-            sha1.update(data)
-
-    return base64.urlsafe_b64encode(sha1.digest()).decode('utf-8')
-
 def convert_byte_sz_str_to_int(value):
     """Takes a human-readble byte size string and returns the long form"""
 
@@ -81,16 +84,188 @@ def convert_byte_sz_str_to_int(value):
     else:
         return int(value)
 
+def find_paths(args):
+    """Returns the FILE arguments of a command line"""
+
+    paths = []
+    skip = False
+    for index, arg in enumerate(args):
+        if skip:
+            skip = False
+        elif arg in VALUE_OPTIONS:
+            skip = True
+        elif arg == '--status':
+            # --status takes an optional status
+            skip = index + 1 < len(args) and args[index + 1].upper() == 'USABLE'
+        elif not arg.startswith('-'):
+            paths.append(arg)
+
+    return paths
+
+def expand_paths(paths):
+    """Returns the files named by paths: files, directories (recursively) and globs"""
+
+    filenames = []
+    seen = set()
+    for path_ in paths:
+        if os.path.isdir(path_):
+            matches = []
+            for root, dirs, files in os.walk(path_):
+                dirs.sort()
+                matches.extend(os.path.join(root, name) for name in sorted(files))
+        elif os.path.exists(path_):
+            matches = [path_]
+        else:
+            matches = sorted(glob.glob(path_))
+
+        for filename in matches:
+            if os.path.isfile(filename) and os.path.abspath(filename) not in seen:
+                seen.add(os.path.abspath(filename))
+                filenames.append(filename)
+
+    return filenames
+
+class Throughput(object):
+    """Counts uploaded bytes and prints the aggregate rate every interval seconds"""
+
+    def __init__(self, file_count, interval=1.0):
+        self.file_count = file_count
+        self.interval = interval
+        self.files_done = 0
+        self.sent_bytes = 0
+        self.start = time.time()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def progress(self, patch_index, patch_count, patch_bytes):
+        with self._lock:
+            self.sent_bytes += patch_bytes
+
+    def file_done(self):
+        with self._lock:
+            self.files_done += 1
+
+    def summary(self):
+        elapsed = max(time.time() - self.start, 1e-6)
+
+        return 'Files %d/%d  Sent %.1f MB  %.1f MB/s' % (
+            self.files_done, self.file_count, self.sent_bytes / 1048576.0,
+            self.sent_bytes / 1048576.0 / elapsed)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        sys.stderr.write('\r' + self.summary() + '\n')
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            sys.stderr.write('\r' + self.summary())
+            sys.stderr.flush()
+
+def ingest(client, filenames, upload, patch_size, max_in_flight, memory_budget=None,
+           hash_workers=None, hash_processes=False, index=None, journal=None,
+           history=None, verbose=False):
+    """Hashes, looks up and (if upload) uploads many files; returns their manifest"""
+
+    entries = [{'file': filename, 'size': getsize(filename)} for filename in filenames]
+
+    # Hash every file, several at a time; the index hashes only files it has not seen
+    if index is not None:
+        workers = hash_workers or hash_workers_default()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sha1s = list(executor.map(index.sha1, filenames))
+    else:
+        sha1s = calc_sha1s(filenames, hash_workers, processes=hash_processes)
+
+    for entry, sha1 in zip(entries, sha1s):
+        entry['sha1'] = sha1
+
+    # Find out which assets already exist in one concurrent bulk lookup
+    unknown = [entry['sha1'] for entry in entries
+               if index is None or index.asset_id(entry['sha1']) is None]
+    # A failed lookup has its exception in place of a response
+    statuses = client.get_asset_statuses(unknown, concurrency=max_in_flight)
+
+    missing = []
+    duplicates = {}
+    for entry in entries:
+        asset_id = index.asset_id(entry['sha1']) if index is not None else None
+        resp = statuses.get(entry['sha1'])
+        if asset_id is not None:
+            entry.update(asset_id=asset_id, result='indexed')
+        elif isinstance(resp, Exception):
+            entry.update(asset_id=None, result='error', error=str(resp))
+        elif resp is not None and resp.status_code == 200 and 'id' in resp.json():
+            entry.update(asset_id=resp.json()['id'], result='exists')
+            if index is not None:
+                index.record_asset(entry['sha1'], entry['asset_id'])
+        elif upload:
+            # Files with the same content are uploaded once
+            if entry['sha1'] in duplicates:
+                duplicates[entry['sha1']].append(entry)
+            else:
+                duplicates[entry['sha1']] = []
+                missing.append(entry)
+        else:
+            entry.update(asset_id=None, result='missing')
+
+    if not missing:
+        return entries
+
+    # Upload the missing files several at a time. The concurrency and memory budgets
+    # are split evenly between the files in flight, each getting at least one patch
+    parallel = max(1, min(len(missing), max_in_flight))
+    per_file_in_flight = max(1, max_in_flight // parallel)
+    per_file_memory = memory_budget // parallel if memory_budget is not None else None
+    throughput = Throughput(len(missing))
+
+    def upload_entry(entry):
+        start = time.time()
+        try:
+            entry['asset_id'] = client.upload_file(entry['file'], patch_size=patch_size,
+                                                   max_in_flight=per_file_in_flight,
+                                                   max_buffered_bytes=per_file_memory,
+                                                   progress=throughput.progress,
+                                                   sha1=entry['sha1'], index=index,
+                                                   journal=journal, history=history)
+            entry['result'] = 'uploaded'
+        except Exception as error:
+            entry.update(asset_id=None, result='error', error=str(error))
+
+        entry['seconds'] = round(time.time() - start, 3)
+        for duplicate in duplicates[entry['sha1']]:
+            duplicate.update((key, value) for key, value in entry.items()
+                             if key not in ('file', 'size'))
+
+        throughput.file_done()
+        if verbose:
+            sys.stderr.write('\r%s: %s\n' % (entry['file'], entry['result']))
+
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        list(executor.map(upload_entry, missing))
+
+    throughput.stop()
+
+    return entries
+
 def print_help():
     """Prints out the details of command line usage of this program"""
 
     print("""Usage: python assets.py [OPTION]... [FILE]...')
 Adds asset FILEs to the Very Large Bits system. Examples:
     python assets.py movie.mp4
+    python assets.py --manifest manifest.json media/ 'clips/*.mov' movie.mp4
     python assets.py -v movie.mp4
     python assets.py --patch-size 24000000 movie.mp4
     python assets.py --patch-size 24MB movie.mp4
+    python assets.py --patch-size 24MB --concurrency 8 movie.mp4
+    python assets.py --patch-size auto --history throughput.json movie.mp4
     python assets.py --key 0gjv9kpbct9w68809r6jh5ppgb --secret mykeyfile.pkcs8 movie.mp4
+    python assets.py --index assets.db movie.mp4
+    python assets.py --journal uploads movie.mp4
 
 Also blocks until a specific status is reached. Example:
     python assets.py --status USABLE movie.mp4
@@ -105,6 +280,31 @@ Security OPTIONs when using basic API authentication:
 
 Data OPTIONS:
     --patch-size      Override the default config.json patch-size value (default 4MB).
+                      Use auto to pick the patch size and concurrency from measured
+                      throughput.
+    --history         Override the config.json history-filename value, where throughput
+                      measured with --patch-size auto is kept between runs.
+    -c or --concurrency
+                      The number of patches uploaded at the same time (default 4).
+    -j or --journal   Override the config.json journal-directory value. Interrupted
+                      uploads recorded in the journal resume where they stopped;
+                      records of assets since reported USABLE are removed.
+
+Ingest OPTIONs, used when several FILEs are given (FILEs may be directories, which
+are searched recursively, or glob patterns):
+    --hash-workers    The number of files hashed at the same time (default: one per
+                      core).
+    --hash-processes  Hash files in worker processes rather than threads.
+    --memory          The file data held in memory by all uploads together (default
+                      256MB). --concurrency patches are in flight across all files.
+    --manifest        Write a JSON manifest of every file's hash, asset id and outcome
+                      to this file, or - for standard output.
+
+Index OPTIONs:
+    -i or --index     Override the config.json index-filename value. The index remembers
+                      file hashes and asset ids so unchanged files are not hashed or
+                      looked up again.
+    --compact-index   Remove stale entries from the index and exit.
 
 Other OPTIONs:
     -h or --help      Print this message.
@@ -136,8 +336,18 @@ def main():
     elif PATCH_SIZE not in data:
         data[PATCH_SIZE] = PATCH_SIZE_DEFAULT
 
-    # Allow for MB/KB suffixes to make patch size easier to understand
-    patch_size = convert_byte_sz_str_to_int(data[PATCH_SIZE])
+    # Allow for MB/KB suffixes to make patch size easier to understand, or for choosing
+    # the patch size from measured throughput
+    if str(data[PATCH_SIZE]).lower() == AUTO:
+        patch_size = AUTO
+    else:
+        patch_size = convert_byte_sz_str_to_int(data[PATCH_SIZE])
+
+    # Allow for remembering measured throughput between runs
+    if '--history' in sys.argv:
+        data[HISTORY] = sys.argv[sys.argv.index('--history') + 1]
+
+    history = ThroughputHistory(data[HISTORY]) if HISTORY in data else None
 
     # Allow for API key or email override
     if '-k' in sys.argv:
@@ -183,11 +393,47 @@ def main():
         else:
             print_help()
 
-    # Create either a BASIC or SIGNATURE api client
+    # Allow for a local index of file hashes and asset ids
+    if '-i' in sys.argv:
+        data[INDEX] = sys.argv[sys.argv.index('-i') + 1]
+    elif '--index' in sys.argv:
+        data[INDEX] = sys.argv[sys.argv.index('--index') + 1]
+
+    index = AssetIndex(data[INDEX]) if INDEX in data else None
+    if '--compact-index' in sys.argv:
+        if index is None:
+            print_help()
+
+        print('Removed %d stale index entries' % index.compact())
+        sys.exit()
+
+    # Allow for resuming interrupted uploads
+    if '-j' in sys.argv:
+        data[JOURNAL] = sys.argv[sys.argv.index('-j') + 1]
+    elif '--journal' in sys.argv:
+        data[JOURNAL] = sys.argv[sys.argv.index('--journal') + 1]
+
+    journal = UploadJournal(data[JOURNAL]) if JOURNAL in data else None
+
+    # Allow for changing the number of patches uploaded at the same time
+    if '-c' in sys.argv:
+        max_in_flight = int(sys.argv[sys.argv.index('-c') + 1])
+    elif '--concurrency' in sys.argv:
+        max_in_flight = int(sys.argv[sys.argv.index('--concurrency') + 1])
+    else:
+        max_in_flight = MAX_IN_FLIGHT_DEFAULT
+
+    # Create either a BASIC or SIGNATURE api client with a connection per upload worker
     if API_KEY in data:
-        client = Client.from_sig_auth(data[API_KEY], data[PRIVATE_KEY], service_url=data[SERVICE_URL])
+        client = Client.from_sig_auth(data[API_KEY], data[PRIVATE_KEY], service_url=data[SERVICE_URL],
+                                      pool_maxsize=max_in_flight)
     else:
-        client = Client.from_basic_auth(data[EMAIL], data[PASSWORD], service_url=data[SERVICE_URL])
+        client = Client.from_basic_auth(data[EMAIL], data[PASSWORD], service_url=data[SERVICE_URL],
+                                        pool_maxsize=max_in_flight)
+
+    # Records of earlier uploads are no longer needed once their assets are USABLE
+    if journal is not None:
+        journal.prune(client)
 
     # Allow for changing the default 10 minute wait time for status checks
     if '-w' in sys.argv:
@@ -197,23 +443,88 @@ def main():
     else:
         wait_secs = 600
 
-    # The file should be the last argument
-    filename = sys.argv[len(sys.argv) - 1]
+    # --status with any status but USABLE only reports; --status USABLE uploads too
+    if '--status' in sys.argv:
+        status = (sys.argv[sys.argv.index('--status') + 1:] or [''])[0]
+        report_only = status.upper() != 'USABLE'
+    else:
+        report_only = False
+
+    # Every FILE argument, with directories and globs expanded
+    filenames = expand_paths(find_paths(sys.argv[1:]))
+    if not filenames:
+        print_help()
+
+    # Several files, or any file with a manifest, are ingested together
+    if len(filenames) > 1 or '--manifest' in sys.argv:
+        if '--hash-workers' in sys.argv:
+            hash_workers = int(sys.argv[sys.argv.index('--hash-workers') + 1])
+        else:
+            hash_workers = None
+
+        if '--memory' in sys.argv:
+            memory_budget = sys.argv[sys.argv.index('--memory') + 1]
+            memory_budget = convert_byte_sz_str_to_int(memory_budget)
+        else:
+            memory_budget = convert_byte_sz_str_to_int(MEMORY_BUDGET_DEFAULT)
+
+        entries = ingest(client, filenames,
+                         upload=not report_only,
+                         patch_size=patch_size,
+                         max_in_flight=max_in_flight,
+                         memory_budget=memory_budget,
+                         hash_workers=hash_workers,
+                         hash_processes='--hash-processes' in sys.argv,
+                         index=index,
+                         journal=journal,
+                         history=history,
+                         verbose=verbose)
+
+        if '--manifest' in sys.argv:
+            manifest = sys.argv[sys.argv.index('--manifest') + 1]
+            if manifest == '-':
+                json.dump(entries, sys.stdout, indent=2)
+                print()
+            else:
+                with open(manifest, 'w') as manifest_file:
+                    json.dump(entries, manifest_file, indent=2)
+
+        results = {}
+        for entry in entries:
+            results[entry['result']] = results.get(entry['result'], 0) + 1
+
+        print(', '.join('%d %s' % (results[result], result) for result in sorted(results)),
+              file=sys.stderr)
+        sys.exit(1 if 'error' in results else 0)
+
+    filename = filenames[0]
     if verbose:
         print('File: %s' % filename)
 
     # All operations will require the URL-safe base64 encoded SHA1 file hash
-    sha1 = calc_sha1(filename)
+    if index is not None:
+        sha1 = index.sha1(filename)
+    else:
+        sha1 = calc_sha1(filename)
+
     if verbose:
         print('Hash: %s' % sha1)
 
+    # An indexed asset id saves asking the service
+    if index is not None and index.asset_id(sha1) is not None:
+        print('Asset: %s' % index.asset_id(sha1))
+        sys.exit()
+
     # Main logic: Do we check the status of an asset file or upload one?
-    if '--status' in sys.argv and sys.argv[sys.argv.index('--status') + 1].upper() != 'USABLE':
+    if report_only:
         # We should check the status of the given file
         resp = client.get_asset_status(sha1)
         if resp.status_code == 200:
             resp = resp.json()
             if 'id' in resp:
+                if index is not None:
+                    index.record_asset(sha1, resp['id'])
+
                 print('Asset: %s' % resp['id'])
             else:
                 print('Asset not found in the Very Large Bits system')
@@ -222,13 +533,16 @@ def main():
     else:
         # We should upload the given file
         if verbose:
-            print('Patch size: %s bytes' % patch_size)
+            print('Patch size: %s' % patch_size)
 
         # First we check to see if the asset already exists
         resp = client.get_asset_status(sha1)
         if resp.status_code == 200:
             resp = resp.json()
             if 'id' in resp:
+                if index is not None:
+                    index.record_asset(sha1, resp['id'])
+
                 print('Asset: %s' % resp['id'])
                 sys.exit()
         else:
@@ -238,29 +552,23 @@ def main():
         if verbose:
             print("File size: %d" % file_size)
 
-        patch_count = int(math.ceil(float(file_size) / float(patch_size)))
-
-        # Start uploading in patch-size chunks
-        asset_id = None
-        with open(filename, 'rb') as file_:
-            for patch_index in range(0, patch_count):
-                if verbose:
-                    print('Sending part %d of %d' % (patch_index + 1, patch_count))
-
-                data = file_.read(patch_size)
-
-                if patch_index == 0:
-                    resp = client.post_asset(data, sha1, patch_count - 1)
-                    if resp.status_code != 200:
-                        print('HTTP Error: %s' % resp)
-                        sys.exit()
-                    else:
-                        asset_id = resp.json()['id']
-                else:
-                    resp = client.patch_asset(asset_id, patch_index, data)
-                    if resp.status_code != 200:
-                        print('HTTP Error: %s' % resp)
-                        sys.exit()
+        def progress(patch_index, patch_count, patch_bytes):
+            if verbose:
+                print('Sent part %d of %d' % (patch_index + 1, patch_count))
+
+        # Upload in patch-size chunks, several patches at a time
+        try:
+            asset_id = client.upload_file(filename,
+                                          patch_size=patch_size,
+                                          max_in_flight=max_in_flight,
+                                          progress=progress,
+                                          sha1=sha1,
+                                          index=index,
+                                          journal=journal,
+                                          history=history)
+        except UploadError as error:
+            print(error)
+            sys.exit()
 
         print('Asset: %s' % asset_id)
 
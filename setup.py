@@ -48,7 +48,8 @@ setup(
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
     zip_safe=False,
-    install_requires=["pycryptodome", "requests"],
+    install_requires=['futures; python_version < "3.0"', "pycryptodome>=3.15", "requests"],
+    extras_require={"async": ["aiohttp"], "fast-json": ["orjson"]},
     tests_require=["future", "unittest2"],
     test_suite="tests.all_tests",
 )
@@ -22,13 +22,57 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
 
 import os.path
+import sys
 import unittest
 
 def all_tests():
     """Default test suite"""
 
+    from .test_batch import BatchTestCase
+    from .test_body import BodyTestCase
     from .test_client import ClientTestCase
+    from .test_codec import CodecTestCase
+    from .test_hashing import HashingTestCase
+    from .test_index import IndexTestCase
+    from .test_journal import JournalTestCase
+    from .test_lookup import LookupTestCase
+    from .test_metrics import MetricsTestCase
+    from .test_ratelimit import RateLimitTestCase
+    from .test_renders import RendersTestCase
+    from .test_retry import RetryTestCase
+    from .test_signing import SigningTestCase
+    from .test_templates import TemplatesTestCase
+    from .test_tuning import TuningTestCase
+    from .test_upload import UploadTestCase
+    from .test_watch import WatchTestCase
 
+    batch_suite = unittest.TestLoader().loadTestsFromTestCase(BatchTestCase)
+    body_suite = unittest.TestLoader().loadTestsFromTestCase(BodyTestCase)
     client_suite = unittest.TestLoader().loadTestsFromTestCase(ClientTestCase)
+    codec_suite = unittest.TestLoader().loadTestsFromTestCase(CodecTestCase)
+    hashing_suite = unittest.TestLoader().loadTestsFromTestCase(HashingTestCase)
+    index_suite = unittest.TestLoader().loadTestsFromTestCase(IndexTestCase)
+    journal_suite = unittest.TestLoader().loadTestsFromTestCase(JournalTestCase)
+    lookup_suite = unittest.TestLoader().loadTestsFromTestCase(LookupTestCase)
+    metrics_suite = unittest.TestLoader().loadTestsFromTestCase(MetricsTestCase)
+    ratelimit_suite = unittest.TestLoader().loadTestsFromTestCase(RateLimitTestCase)
+    renders_suite = unittest.TestLoader().loadTestsFromTestCase(RendersTestCase)
+    retry_suite = unittest.TestLoader().loadTestsFromTestCase(RetryTestCase)
+    signing_suite = unittest.TestLoader().loadTestsFromTestCase(SigningTestCase)
+    templates_suite = unittest.TestLoader().loadTestsFromTestCase(TemplatesTestCase)
+    tuning_suite = unittest.TestLoader().loadTestsFromTestCase(TuningTestCase)
+    upload_suite = unittest.TestLoader().loadTestsFromTestCase(UploadTestCase)
+    watch_suite = unittest.TestLoader().loadTestsFromTestCase(WatchTestCase)
 
-    return unittest.TestSuite([client_suite])
+    suites = [batch_suite, body_suite, client_suite, codec_suite, hashing_suite,
+              index_suite, journal_suite, lookup_suite, metrics_suite, ratelimit_suite,
+              renders_suite, retry_suite, signing_suite, templates_suite, tuning_suite,
+              upload_suite, watch_suite]
+
+    # The asyncio client needs Python 3.5 syntax
+    if sys.version_info >= (3, 5):
+        from .test_aio import AsyncClientTestCase
+
+        suites.append(unittest.TestLoader().loadTestsFromTestCase(AsyncClientTestCase))
+
+    return unittest.TestSuite(suites)
@@ -0,0 +1,112 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+import asyncio
+from http.server import BaseHTTPRequestHandler
+import json
+import threading
+
+import unittest2 as unittest
+
+try:
+    from verylargebits.aio import AsyncClient
+except ImportError:
+    AsyncClient = None
+
+from .test_client import MockService, handler_class
+
+class PatchRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    bodies = None
+    lock = threading.Lock()
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.lock:
+            self.bodies[self.path] = (self.headers['Authorization'], body)
+
+        self.reply({})
+
+    def do_GET(self):
+        self.reply({'id': self.path.split('/')[-1]})
+
+    def reply(self, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@unittest.skipIf(AsyncClient is None, 'aiohttp is not installed')
+class AsyncClientTestCase(unittest.TestCase):
+    def run_async(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def test_get_asset_status(self):
+        service = MockService(handler_class(PatchRequestHandler, bodies={}),
+                              threaded=True)
+
+        async def run():
+            async with AsyncClient.from_basic_auth('test', 'password',
+                                                   service_url=service.url) as client:
+                responses = await asyncio.gather(*[client.get_asset_status(str(index))
+                                                   for index in range(5)])
+
+            # Responses decode with the client's codec, as Client.json() does
+            self.assertTrue(all(response.codec is client.codec for response in responses))
+            return [response.json()['id'] for response in responses]
+
+        self.assertEqual(self.run_async(run()), ['0', '1', '2', '3', '4'])
+        service.stop()
+
+    def test_patch_asset(self):
+        bodies = {}
+        service = MockService(handler_class(PatchRequestHandler, bodies=bodies),
+                              threaded=True)
+
+        async def run():
+            client = AsyncClient.from_basic_auth('test', 'password', service_url=service.url,
+                                                 max_concurrency=2)
+            first = await client.patch_asset('asset', 1, memoryview(b'0123456789')[2:6])
+            second = await client.patch_asset('asset', 2, (chunk for chunk in [b'ab', b'cd']))
+            await client.close()
+
+            return first.status_code, second.status_code
+
+        self.assertEqual(self.run_async(run()), (200, 200))
+        self.assertEqual(bodies, {
+            '/asset/asset/1': ('Basic dGVzdDpwYXNzd29yZA==', b'2345'),
+            '/asset/asset/2': ('Basic dGVzdDpwYXNzd29yZA==', b'abcd'),
+        })
+        service.stop()
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.concurrency import bounded_map
+
+from .test_client import MockService
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Accepts renders whose vars name a positive number and echoes it as the id"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8'))
+        number = body['vars']['number']
+        if number < 0:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(json.dumps({'id': str(number)}).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class BatchTestCase(unittest.TestCase):
+    def test_post_renders(self):
+        service = MockService(RenderRequestHandler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        vars_iterable = ({'number': number} for number in [3, -1, 5, 7])
+        results = list(client.post_renders('template', vars_iterable, concurrency=2,
+                                           ordered=True))
+
+        self.assertEqual([result.index for result in results], [0, 1, 2, 3])
+        self.assertEqual([result.ok for result in results], [True, False, True, True])
+        self.assertEqual([result.render_id for result in results], ['3', None, '5', '7'])
+        self.assertEqual(results[1].response.status_code, 500)
+        service.stop()
+
+    def test_post_renders_connection_error(self):
+        client = Client.from_basic_auth('test', 'password', service_url='http://localhost:1')
+        results = list(client.post_renders('template', [{'number': 1}]))
+
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0].ok)
+        self.assertIsNotNone(results[0].error)
+
+    def test_bounded_map_reads_lazily(self):
+        pulled = []
+
+        def numbers():
+            for number in range(100):
+                pulled.append(number)
+                yield number
+
+        results = bounded_map(lambda number: number * 2, numbers(), 3)
+        self.assertEqual(len([next(results) for _ in range(2)]), 2)
+        self.assertLessEqual(len(pulled), 5)
+        results.close()
+
+        results = bounded_map(lambda number: time.sleep(0.01 * (5 - number)) or number,
+                              range(5), 5, ordered=True)
+        self.assertEqual([future.result() for _, _, future in results], [0, 1, 2, 3, 4])
@@ -0,0 +1,88 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import base64
+import json
+import os
+import tempfile
+
+import unittest2 as unittest
+
+from verylargebits.body import (FileRegion, JsonAssetBody, StreamBody, body_chunks,
+                                body_length)
+
+class BodyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.file_ = tempfile.TemporaryFile()
+        self.data = os.urandom(1000)
+        self.file_.write(self.data)
+        self.file_.flush()
+
+    def tearDown(self):
+        self.file_.close()
+
+    def test_file_region(self):
+        region = FileRegion(self.file_, 100, 500, chunk_size=128)
+        chunks = list(region)
+        self.assertEqual([len(chunk) for chunk in chunks], [128, 128, 128, 116])
+        self.assertEqual(b''.join(chunks), self.data[100:600])
+        self.assertEqual(b''.join(region), self.data[100:600])
+
+    def test_body_chunks(self):
+        self.assertEqual(body_chunks(b'abc'), [b'abc'])
+        self.assertEqual(body_chunks(bytearray(b'abc'))[0].tobytes(), b'abc')
+        self.assertEqual(body_chunks(chunk for chunk in [b'a', b'bc']), [b'a', b'bc'])
+
+        self.file_.seek(600)
+        region = body_chunks(self.file_)
+        self.assertIsInstance(region, FileRegion)
+        self.assertEqual(body_length(region), 400)
+        self.assertEqual(b''.join(region), self.data[600:])
+
+    def test_stream_body(self):
+        body = StreamBody([b'abc', memoryview(b'defgh'), b'ij'])
+        self.assertEqual(len(body), 10)
+        self.assertEqual(body.read(2), b'ab')
+        self.assertEqual(body.read(4), b'c')
+        self.assertEqual(body.read(4), b'defg')
+        self.assertEqual(body.read(), b'hij')
+        self.assertEqual(body.read(4), b'')
+
+    def test_json_asset_body(self):
+        cases = ((b'', []), (b'a', []), (b'abcd', [1, 2]), (self.data, [7, 500, 501]))
+        for data, splits in cases:
+            chunks = [data[start:end] for start, end in zip([0] + splits, splits + [len(data)])]
+            body = JsonAssetBody(chunks, 'hash', 3)
+            expected = json.dumps({
+                'data': base64.b64encode(data).decode('utf-8'),
+                'hash': 'hash',
+                'patch_count': 3,
+            }, sort_keys=True).encode('utf-8')
+
+            self.assertEqual(b''.join(body), expected)
+            self.assertEqual(b''.join(body), expected)
+            self.assertEqual(len(body), len(expected))
+
+        region = JsonAssetBody(FileRegion(self.file_, 0, 1000, chunk_size=100), None, 1)
+        self.assertEqual(json.loads(b''.join(region).decode('utf-8'))['data'],
+                         base64.b64encode(self.data).decode('utf-8'))
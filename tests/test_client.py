@@ -27,13 +27,22 @@ standard_library.install_aliases()
 from base64 import b64decode, b64encode
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
+import os
 from socket import AF_INET, SOCK_STREAM, socket
+from socketserver import ThreadingMixIn
+import subprocess
+import sys
+import tempfile
 from threading import Thread
 
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import DSS, eddsa, pkcs1_15
 import requests
 import unittest2 as unittest
 
-from verylargebits.client import Client
+from verylargebits.client import Client, SignatureAuthClient
+from verylargebits.signing import export_key
 
 def get_free_port(host):
     """Tries to pick a port that likely will be free when needed."""
@@ -45,11 +54,57 @@ def get_free_port(host):
 
     return port
 
+def write_private_key(key):
+    """Writes the given key to a temporary PEM file and returns the filename"""
+
+    file_, filename = tempfile.mkstemp(suffix='.pem')
+    data = export_key(key)
+    os.write(file_, data if isinstance(data, bytes) else data.encode('ascii'))
+    os.close(file_)
+
+    return filename
+
+def verify_authorization(header, verb, url, body, public_key):
+    """A mock of the service's check of a Signature Authorization header"""
+
+    scheme, _, credentials = header.partition(' ')
+    api_key, algorithm, signature = credentials.split(':')
+    digest = SHA256.new(verb.encode('utf-8') + url.encode('utf-8') + body)
+    if algorithm == 'SHA256':
+        # pkcs1_15 raises on a bad signature; the legacy PKCS1_v1_5 only returns False
+        verifier = pkcs1_15.new(public_key)
+    elif algorithm == 'ED25519-SHA256':
+        verifier = eddsa.new(public_key, 'rfc8032')
+        digest = digest.digest()
+    elif algorithm == 'ECDSA-SHA256':
+        verifier = DSS.new(public_key, 'fips-186-3')
+    else:
+        return None
+
+    try:
+        verifier.verify(digest, b64decode(signature))
+    except ValueError:
+        return None
+
+    return api_key if scheme == 'Signature' else None
+
+def handler_class(handler, **attributes):
+    """Returns a subclass of handler with the given class attributes
+
+    BaseHTTPRequestHandler is a classic class on Python 2, so object is added as a base
+    for type() to accept it."""
+
+    return type(handler.__name__, (handler, object), attributes)
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
 class MockService(object):
-    def __init__(self, handler):
+    def __init__(self, handler, threaded=False):
         self.port = get_free_port('localhost')
         self.url = 'http://localhost:' + str(self.port)
-        self.server = HTTPServer(('localhost', self.port), handler)
+        server_class = ThreadingHTTPServer if threaded else HTTPServer
+        self.server = server_class(('localhost', self.port), handler)
         self.thread = Thread(target=self.server.serve_forever)
         self.thread.daemon = True
         self.thread.start()
@@ -95,3 +150,133 @@ class ClientTestCase(unittest.TestCase):
         response = client.post_asset(b'my-data').json()
         self.assertEqual(response['id'], 'l3pgbkpbcm5l41kt4tdgf2x4jq')
         service.stop()
+
+    def test_patch_asset_buffer(self):
+        bodies = []
+
+        class TestRequestHandler(BaseHTTPRequestHandler):
+            def do_PATCH(self):
+                bodies.append(self.rfile.read(int(self.headers['Content-Length'])))
+                self.send_response(200)
+                self.end_headers()
+
+        service = MockService(TestRequestHandler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        data = bytearray(b'0123456789')
+        self.assertEqual(client.patch_asset('asset', 1, memoryview(data)[2:6]).status_code, 200)
+        self.assertEqual(client.patch_asset('asset', 2, data).status_code, 200)
+        self.assertEqual(bodies, [b'2345', b'0123456789'])
+        service.stop()
+
+    def test_patch_asset_stream(self):
+        key_filename = write_private_key(RSA.generate(1024))
+        auth_impl = SignatureAuthClient('key', key_filename)
+        bodies = []
+
+        class TestRequestHandler(BaseHTTPRequestHandler):
+            def do_PATCH(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                bodies.append(body)
+                expected = auth_impl.auth_value('PATCH', self.path, body)
+                self.send_response(200 if self.headers['Authorization'] == expected else 401)
+                self.end_headers()
+
+        service = MockService(TestRequestHandler)
+        client = Client(auth_impl, service.url)
+        resp = client.patch_asset('asset', 1, (chunk for chunk in [b'01', b'2345', b'6789']))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(bodies, [b'0123456789'])
+        self.assertEqual(auth_impl.auth_value_iter('PATCH', '/asset/asset/1', [b'0123', b'456789']),
+                         auth_impl.auth_value('PATCH', '/asset/asset/1', b'0123456789'))
+        service.stop()
+        os.remove(key_filename)
+
+    def test_signature_algorithms(self):
+        keys = [
+            ('SHA256', RSA.generate(1024)),
+            ('ED25519-SHA256', ECC.generate(curve='ed25519')),
+            ('ECDSA-SHA256', ECC.generate(curve='P-256')),
+        ]
+
+        for algorithm, private_key in keys:
+            public_key = private_key.public_key()
+            key_filename = write_private_key(private_key)
+            verified = []
+            received = []
+
+            class TestRequestHandler(BaseHTTPRequestHandler):
+                def do_PATCH(self):
+                    body = self.rfile.read(int(self.headers['Content-Length']))
+                    received.append((self.headers['Authorization'], self.path, body))
+                    verified.append(verify_authorization(self.headers['Authorization'],
+                                                         'PATCH', self.path, body, public_key))
+                    self.send_response(200 if verified[-1] == 'key' else 401)
+                    self.end_headers()
+
+            service = MockService(TestRequestHandler)
+            with Client.from_sig_auth('key', key_filename, service_url=service.url) as client:
+                resp = client.patch_asset('asset', 1, [b'0123', b'456789'])
+                self.assertEqual(resp.status_code, 200, algorithm)
+                self.assertIn(':' + algorithm + ':', resp.request.headers['Authorization'])
+
+            self.assertEqual(verified, ['key'])
+            service.stop()
+            os.remove(key_filename)
+
+            # A tampered signature or body must not verify
+            header, path, body = received[0]
+            prefix, _, signature = header.rpartition(':')
+            signature = bytearray(b64decode(signature))
+            signature[0] ^= 1
+            tampered = prefix + ':' + b64encode(bytes(signature)).decode('ascii')
+            self.assertIsNone(verify_authorization(tampered, 'PATCH', path, body, public_key),
+                              algorithm)
+            self.assertIsNone(verify_authorization(header, 'PATCH', path, body + b'!',
+                                                   public_key), algorithm)
+
+    def test_lazy_imports(self):
+        # Importing the client and signing nothing must not load the backends
+        code = ('import sys, verylargebits.client\n'
+                'client = verylargebits.client.Client.from_sig_auth("key", "missing.pem")\n'
+                'print(" ".join(name for name in ("Crypto", "requests") if name in sys.modules))')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=root)
+        self.assertEqual(output.strip(), b'')
+
+    def test_keep_alive_connection_reuse(self):
+        ports = []
+
+        class TestRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                ports.append(self.client_address[1])
+                body = json.dumps({'id': 'l3pgbkpbcm5l41kt4tdgf2x4jq'}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        service = MockService(TestRequestHandler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        for _ in range(3):
+            self.assertEqual(client.get_asset_status('sha1').status_code, 200)
+
+        self.assertEqual(len(ports), 3)
+        self.assertEqual(len(set(ports)), 1)
+        client.close()
+        service.stop()
+
+    def test_session_rebuilt_after_fork(self):
+        client = Client.from_basic_auth('test', 'password', pool_maxsize=4)
+        session = client.session
+        self.assertIs(client.session, session)
+
+        # Pretend the session was inherited from a parent process
+        client._session_pid = -1
+        self.assertIsNot(client.session, session)
+        client.close()
@@ -0,0 +1,83 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+
+import unittest2 as unittest
+
+from verylargebits import codec
+from verylargebits.client import Client
+
+from .test_client import MockService
+
+class CodecTestCase(unittest.TestCase):
+    def test_codecs(self):
+        codecs = [codec.JsonCodec()]
+        if codec.orjson is not None:
+            codecs.append(codec.OrjsonCodec())
+
+        value = {'name': u'café', 'sizes': [1, 2.5, None, True], 'nested': {'a': {}}}
+        for codec_ in codecs:
+            data = codec_.dumps(value)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(json.loads(data.decode('utf-8')), value)
+            self.assertEqual(codec_.loads(data), value)
+            self.assertEqual(codec_.loads(data.decode('utf-8')), value)
+
+    def test_encoded(self):
+        self.assertEqual(codec.encoded({'a': 1}, codec.JsonCodec()), b'{"a":1}')
+        self.assertEqual(codec.encoded(b'{"a": 1}', codec.JsonCodec()), b'{"a": 1}')
+
+    def test_post_render_encoded(self):
+        bodies = []
+
+        class TestRequestHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                bodies.append(json.loads(self.rfile.read(
+                    int(self.headers['Content-Length'])).decode('utf-8')))
+                body = json.dumps({'id': 'render'}).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        service = MockService(TestRequestHandler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        codec=codec.JsonCodec())
+        storage = client.codec.dumps({'bucket': 'renders'})
+
+        response = client.post_render('template', storage=storage, vars_={'title': 'a'})
+        self.assertEqual(client.json(response), {'id': 'render'})
+        client.post_template(b'{"layers": []}')
+        self.assertEqual(bodies, [
+            {'src': 'template', 'storage': {'bucket': 'renders'}, 'vars': {'title': 'a'}},
+            {'layers': []},
+        ])
+        service.stop()
@@ -0,0 +1,62 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+
+import unittest2 as unittest
+
+from verylargebits.hashing import calc_sha1, calc_sha1s
+
+class HashingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = {}
+        for size in (0, 1, 4095, 4096, 70000):
+            filename = os.path.join(self.directory, '%d.bin' % size)
+            data = os.urandom(size)
+            with open(filename, 'wb') as file_:
+                file_.write(data)
+
+            self.files[filename] = base64.urlsafe_b64encode(
+                hashlib.sha1(data).digest()).decode('utf-8')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_calc_sha1(self):
+        for filename, expected in self.files.items():
+            self.assertEqual(calc_sha1(filename), expected)
+            # Reads shorter than, equal to and dividing the file give the same hash
+            self.assertEqual(calc_sha1(filename, read_size=4096), expected)
+            self.assertEqual(calc_sha1(filename, read_size=1), expected)
+
+    def test_calc_sha1s(self):
+        filenames = sorted(self.files)
+        expected = [self.files[filename] for filename in filenames]
+        self.assertEqual(calc_sha1s(filenames), expected)
+        self.assertEqual(calc_sha1s(filenames, max_workers=3, read_size=4096), expected)
+        self.assertEqual(calc_sha1s(filenames, max_workers=2, processes=True), expected)
+        self.assertEqual(calc_sha1s([]), [])
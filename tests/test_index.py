@@ -0,0 +1,98 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import os
+import shutil
+import tempfile
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.hashing import calc_sha1
+from verylargebits.index import AssetIndex
+
+from .test_client import MockService, handler_class
+from .test_upload import AssetRequestHandler
+
+class IndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = AssetIndex(os.path.join(self.directory, 'index.db'))
+        self.filename = self.write('movie.mp4', b'my-data')
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, data, age=60):
+        filename = os.path.join(self.directory, name)
+        with open(filename, 'wb') as file_:
+            file_.write(data)
+
+        # Backdate the file so its hash is not considered racy
+        mtime = time.time() - age
+        os.utime(filename, (mtime, mtime))
+
+        return filename
+
+    def test_sha1_is_indexed(self):
+        sha1 = self.index.sha1(self.filename)
+        self.assertEqual(sha1, calc_sha1(self.filename))
+        self.assertEqual(self.index.lookup(self.filename), sha1)
+
+        self.write('movie.mp4', b'other-data', age=30)
+        self.assertIsNone(self.index.lookup(self.filename))
+        self.assertNotEqual(self.index.sha1(self.filename), sha1)
+
+    def test_racy_entry_is_not_trusted(self):
+        filename = self.write('new.mp4', b'new-data', age=0)
+        self.index.sha1(filename)
+        self.assertIsNone(self.index.lookup(filename))
+
+    def test_compact(self):
+        sha1 = self.index.sha1(self.filename)
+        self.index.record_asset(sha1, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        other = self.write('other.mp4', b'other-data')
+        self.index.sha1(other)
+
+        os.remove(self.filename)
+        self.assertEqual(self.index.compact(), 2)
+        self.assertIsNone(self.index.asset_id(sha1))
+        self.assertIsNotNone(self.index.lookup(other))
+
+    def test_upload_file_with_index(self):
+        patches = {}
+        service = MockService(handler_class(AssetRequestHandler, patches=patches))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+
+        self.assertEqual(client.upload_file(self.filename, index=self.index),
+                         'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(patches, {0: b'my-data'})
+
+        patches.clear()
+        copy = self.write('copy.mp4', b'my-data')
+        self.assertEqual(client.upload_file(copy, index=self.index),
+                         'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(patches, {})
+        service.stop()
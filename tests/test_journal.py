@@ -0,0 +1,203 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.hashing import calc_sha1
+from verylargebits.journal import UploadJournal
+from verylargebits.upload import UploadError
+
+from .test_client import MockService, handler_class
+from .test_upload import AssetRequestHandler
+
+class JournalRequestHandler(AssetRequestHandler):
+    """Records the order of requests and reports assets with the class-level status"""
+
+    requests = None
+    status = 'USABLE'
+
+    def do_GET(self):
+        self.reply(200, {'id': 'l3pgbkpbcm5l41kt4tdgf2x4jq', 'status': self.status})
+
+    def do_POST(self):
+        self.requests.append(0)
+        AssetRequestHandler.do_POST(self)
+
+    def do_PATCH(self):
+        self.requests.append(int(self.path.split('/')[-1]))
+        AssetRequestHandler.do_PATCH(self)
+
+class JournalTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.journal = UploadJournal(os.path.join(self.directory, 'journal'))
+        self.filename = os.path.join(self.directory, 'movie.mp4')
+        self.data = os.urandom(1000)
+        with open(self.filename, 'wb') as file_:
+            file_.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resume_upload(self):
+        patches = {}
+        requests = []
+        service = MockService(handler_class(JournalRequestHandler, patches=patches,
+                                            requests=requests, fail_patch=2))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        with self.assertRaises(UploadError):
+            client.upload_file(self.filename, patch_size=300, max_in_flight=1,
+                               journal=self.journal)
+
+        self.assertEqual(requests, [0, 1, 2])
+        self.assertEqual(len(self.journal.sha1s()), 1)
+        service.stop()
+
+        del requests[:]
+        handler = handler_class(JournalRequestHandler, patches=patches, requests=requests)
+        service = MockService(handler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        asset_id = client.upload_file(self.filename, patch_size=300, max_in_flight=1,
+                                      journal=self.journal)
+
+        self.assertEqual(asset_id, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(requests, [2, 3])
+        self.assertEqual(b''.join(patches[i] for i in range(4)), self.data)
+        self.assertEqual(os.listdir(self.journal.directory), [])
+        service.stop()
+
+    def test_prune_once_usable(self):
+        patches = {}
+        requests = []
+        handler = handler_class(JournalRequestHandler, patches=patches, requests=requests,
+                                status='PROCESSING')
+        service = MockService(handler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        client.upload_file(self.filename, patch_size=300, max_in_flight=1,
+                           journal=self.journal)
+
+        # Still processing once the last patch is acknowledged: the record stays
+        sha1 = calc_sha1(self.filename)
+        self.assertEqual(self.journal.sha1s(), [sha1])
+        self.assertEqual(self.journal.prune(client), [])
+
+        handler.status = 'USABLE'
+        self.assertEqual(self.journal.prune(client), [sha1])
+        self.assertEqual(os.listdir(self.journal.directory), [])
+        service.stop()
+
+    def test_torn_record_is_ignored(self):
+        with self.journal.open('sha1', 300, 4) as entry:
+            entry.record_asset('l3pgbkpbcm5l41kt4tdgf2x4jq')
+            entry.ack(2)
+
+        with open(self.journal.path('sha1', '.journal'), 'a') as log:
+            log.write('{"patch": 3')
+
+        with self.journal.open('sha1', 300, 4) as entry:
+            self.assertEqual(entry.asset_id, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+            self.assertEqual(entry.missing(), [1, 3])
+            entry.ack(3)
+
+        with self.journal.open('sha1', 300, 4) as entry:
+            self.assertEqual(entry.missing(), [1])
+
+        # A different patch size cannot resume the old record, nor replace it
+        with self.assertRaises(ValueError):
+            self.journal.open('sha1', 500, 2)
+
+        self.assertEqual(self.journal.patch_size('sha1'), 300)
+        with self.journal.open('sha1', 300, 4) as entry:
+            self.assertEqual(entry.missing(), [1])
+
+        # A record torn inside its header is started again
+        with open(self.journal.path('sha1', '.journal'), 'w') as log:
+            log.write('{"sha1": "sh')
+
+        with self.journal.open('sha1', 500, 2) as entry:
+            self.assertIsNone(entry.asset_id)
+            self.assertEqual(entry.missing(), [0, 1])
+
+    def test_resume_with_recorded_patch_size(self):
+        patches = {}
+        requests = []
+        service = MockService(handler_class(JournalRequestHandler, patches=patches,
+                                            requests=requests, fail_patch=2))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        with self.assertRaises(UploadError):
+            client.upload_file(self.filename, patch_size=300, max_in_flight=1,
+                               journal=self.journal)
+
+        service.stop()
+
+        # Asked for 500 byte patches, the upload resumes with the 300 it started with
+        del requests[:]
+        handler = handler_class(JournalRequestHandler, patches=patches, requests=requests)
+        service = MockService(handler)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        asset_id = client.upload_file(self.filename, patch_size=500, max_in_flight=1,
+                                      journal=self.journal)
+
+        self.assertEqual(asset_id, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(requests, [2, 3])
+        self.assertEqual(b''.join(patches[i] for i in range(4)), self.data)
+        service.stop()
+
+    def test_waiter_finds_finished_upload(self):
+        patches = {}
+        requests = []
+        handler = handler_class(JournalRequestHandler, patches=patches, requests=requests)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        sha1 = calc_sha1(self.filename)
+        results = []
+
+        # The first uploader holds the record while a second one waits for it
+        first = self.journal.open(sha1, 300, 4)
+        self.assertFalse(first.waited)
+        waiter = threading.Thread(target=lambda: results.append(
+            client.upload_file(self.filename, patch_size=300, max_in_flight=1,
+                               sha1=sha1, journal=self.journal)))
+        waiter.start()
+        time.sleep(0.3)
+        self.assertEqual(results, [])
+
+        first.record_asset('l3pgbkpbcm5l41kt4tdgf2x4jq')
+        for patch_index in range(1, 4):
+            first.ack(patch_index)
+
+        first.remove()
+        waiter.join()
+
+        # The waiter finds the asset USABLE instead of uploading it again
+        self.assertEqual(results, ['l3pgbkpbcm5l41kt4tdgf2x4jq'])
+        self.assertEqual(requests, [])
+        self.assertEqual(os.listdir(self.journal.directory), [])
+        service.stop()
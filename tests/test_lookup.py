@@ -0,0 +1,139 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.cache import SingleFlight, TTLCache
+from verylargebits.client import Client
+
+from .test_client import MockService, handler_class
+
+class SlowStatusRequestHandler(BaseHTTPRequestHandler):
+    """Answers asset lookups slowly and counts them per SHA1; drops lookups of 'broken'"""
+
+    lookups = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        sha1 = self.path.split('/')[-1]
+        with self.lock:
+            self.lookups[sha1] = self.lookups.get(sha1, 0) + 1
+
+        if sha1 == 'broken':
+            self.close_connection = True
+            return
+
+        time.sleep(0.1)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(json.dumps({'id': 'asset-' + sha1}).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class LookupTestCase(unittest.TestCase):
+    def test_get_asset_statuses(self):
+        lookups = {}
+        service = MockService(handler_class(SlowStatusRequestHandler, lookups=lookups),
+                              threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        results = []
+
+        def run():
+            results.append(client.get_asset_statuses(['a', 'b', 'a', 'c', 'b'], concurrency=3))
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(lookups, {'a': 1, 'b': 1, 'c': 1})
+        for responses in results:
+            self.assertEqual(dict((sha1, response.json()['id'])
+                                  for sha1, response in responses.items()),
+                             {'a': 'asset-a', 'b': 'asset-b', 'c': 'asset-c'})
+        service.stop()
+
+    def test_get_asset_statuses_error(self):
+        lookups = {}
+        service = MockService(handler_class(SlowStatusRequestHandler, lookups=lookups),
+                              threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        responses = client.get_asset_statuses(['a', 'broken', 'b'], concurrency=3)
+
+        # The failed lookup does not lose the others, which are cached as usual
+        self.assertIsInstance(responses['broken'], Exception)
+        self.assertEqual(responses['a'].json()['id'], 'asset-a')
+        self.assertEqual(responses['b'].json()['id'], 'asset-b')
+        client.get_asset_statuses(['a', 'b'])
+        self.assertEqual(lookups, {'a': 1, 'b': 1, 'broken': 1})
+        service.stop()
+
+    def test_ttl_cache(self):
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+
+        cache.set('d', 4, ttl=0)
+        self.assertIsNone(cache.get('d'))
+
+    def test_single_flight_shares_errors(self):
+        flights = SingleFlight()
+        errors = []
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('lookup failed')
+
+        def run():
+            try:
+                flights.do('key', fail)
+            except ValueError as error:
+                errors.append(error)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=run)
+        follower.start()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(errors), 2)
+        self.assertIs(errors[0], errors[1])
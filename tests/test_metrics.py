@@ -0,0 +1,137 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import socket
+import threading
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.metrics import PHASES, Histogram, HistogramAggregator, StatsdExporter
+from verylargebits.retry import RetryPolicy
+
+from .test_client import MockService, handler_class
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    calls = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.calls.append(self.path)
+            first = self.calls.count(self.path) == 1
+
+        # The first render status request fails, to be retried
+        status = 503 if first and self.path.startswith('/render/') else 200
+        body = json.dumps({'id': 'asset', 'status': 'DONE'}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_PATCH(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+class MetricsTestCase(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 5.0):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.quantile(0.5), 0.1)
+        self.assertEqual(histogram.quantile(0.75), 1.0)
+        self.assertEqual(histogram.quantile(1.0), float('inf'))
+
+    def test_hooks(self):
+        calls = []
+        service = MockService(handler_class(MetricsRequestHandler, calls=calls), threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        retry=RetryPolicy(base_delay=0.01))
+        events = []
+        aggregator = HistogramAggregator()
+        client.hooks.subscribe(events.append)
+        client.hooks.subscribe(aggregator)
+
+        self.assertEqual(client.get_asset_status('sha1').status_code, 200)
+        self.assertEqual(client.get_render_status('render').status_code, 200)
+        self.assertEqual(client.patch_asset('asset', 1, b'0123456789').status_code, 200)
+
+        status, render, patch = events
+        self.assertEqual(sorted(status.phases), sorted(PHASES))
+        self.assertGreater(status.phases['connect'], 0)
+        self.assertEqual(status.bytes_received, len(b'{"id": "asset", "status": "DONE"}'))
+        self.assertEqual((render.endpoint, render.status_code), ('get_render_status', 200))
+        self.assertEqual((render.sends, render.retries), (2, 1))
+        self.assertEqual((patch.bytes_sent, patch.sends), (10, 1))
+        # The connection was kept alive
+        self.assertEqual(patch.phases['connect'], 0)
+        self.assertGreaterEqual(patch.phases['total'], patch.phases['send'])
+
+        self.assertEqual(aggregator.counter('requests_total', 'get_render_status'), 1)
+        self.assertEqual(aggregator.counter('retries_total', 'get_render_status'), 1)
+        self.assertEqual(aggregator.histogram('patch_asset', 'total').count, 1)
+        text = aggregator.prometheus_text()
+        self.assertIn('verylargebits_request_phase_seconds_count'
+                      '{endpoint="patch_asset",phase="total"} 1\n', text)
+        self.assertIn('verylargebits_bytes_sent_total{endpoint="patch_asset"} 10\n', text)
+        self.assertIn('verylargebits_requests_total'
+                      '{endpoint="get_render_status",status="200"} 1\n', text)
+
+        client.hooks.unsubscribe(events.append)
+        client.hooks.unsubscribe(aggregator)
+        self.assertFalse(client.hooks)
+        client.get_asset_status('sha1')
+        self.assertEqual(len(events), 3)
+        client.close()
+        service.stop()
+
+    def test_statsd_exporter(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(5)
+
+        calls = []
+        service = MockService(handler_class(MetricsRequestHandler, calls=calls), threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        exporter = client.hooks.subscribe(StatsdExporter(receiver.getsockname()))
+        client.get_asset_status('sha1')
+
+        lines = receiver.recv(65536).decode('utf-8').split('\n')
+        self.assertIn('verylargebits.get_asset_status.status.200:1|c', lines)
+        self.assertTrue(any(line.startswith('verylargebits.get_asset_status.total:')
+                            and line.endswith('|ms') for line in lines))
+        exporter.close()
+        receiver.close()
+        client.close()
+        service.stop()
@@ -0,0 +1,192 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.ratelimit import RateLimiter
+from verylargebits.retry import RetryPolicy
+
+from .test_client import MockService, handler_class
+
+class Response(object):
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {'Retry-After': str(retry_after)}
+
+class LimitedRequestHandler(BaseHTTPRequestHandler):
+    """Answers 429 to requests beyond max_in_flight at once"""
+
+    protocol_version = 'HTTP/1.1'
+    max_in_flight = 2
+    state = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with self.lock:
+            self.state['in_flight'] += 1
+            self.state['peak'] = max(self.state['peak'], self.state['in_flight'])
+            throttled = self.state['in_flight'] > self.max_in_flight
+
+        if throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+        else:
+            time.sleep(0.02)
+            self.send_response(200)
+
+        with self.lock:
+            self.state['in_flight'] -= 1
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def hold_slot(state_file, ready):
+    """Takes a slot of the shared limiter and exits without giving it back"""
+
+    RateLimiter(limit=2, state_file=state_file).acquire()
+    ready.set()
+
+class RateLimitTestCase(unittest.TestCase):
+    def test_aimd_limit(self):
+        limiter = RateLimiter(limit=8, min_limit=2, max_limit=10)
+        tickets = [limiter.acquire() for _ in range(4)]
+
+        # A burst of 429s answering one window of requests cuts the limit once
+        for ticket in tickets[:3]:
+            limiter.release(ticket, Response(429))
+
+        self.assertEqual(limiter.stats()['limit'], 4.0)
+
+        # Each limit's worth of successes adds one
+        limiter.release(tickets[3], Response(200))
+        for _ in range(4):
+            limiter.release(limiter.acquire(), Response(200))
+
+        self.assertTrue(5.0 < limiter.stats()['limit'] < 5.25)
+        self.assertEqual(limiter.stats()['overloads'], 3)
+        self.assertEqual(limiter.stats()['requests'], 8)
+
+        for _ in range(10):
+            limiter.release(limiter.acquire(), Response(503))
+
+        self.assertEqual(limiter.stats()['limit'], 2.0)
+
+    def test_concurrency_limit(self):
+        limiter = RateLimiter(limit=2)
+        tickets = [limiter.acquire(), limiter.acquire()]
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(limiter.acquire()))
+        waiter.start()
+        waiter.join(0.1)
+        self.assertEqual(acquired, [])
+
+        limiter.release(tickets[0], Response(200))
+        waiter.join(1.0)
+        self.assertEqual(len(acquired), 1)
+        self.assertEqual(limiter.stats()['in_flight'], 2)
+
+    def test_token_bucket(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        start = time.time()
+        for _ in range(6):
+            limiter.release(limiter.acquire(), Response(200))
+
+        # The first token is in the bucket, the other five arrive 20ms apart
+        self.assertGreaterEqual(time.time() - start, 0.09)
+
+    def test_retry_after_pauses(self):
+        limiter = RateLimiter(rate=1000, burst=10)
+        limiter.release(limiter.acquire(), Response(429, retry_after=0.2))
+        start = time.time()
+        limiter.release(limiter.acquire(), Response(200))
+        self.assertGreaterEqual(time.time() - start, 0.19)
+
+    def test_shared_state_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            state_file = os.path.join(directory, 'limit.json')
+            first = RateLimiter(limit=2, state_file=state_file)
+            second = RateLimiter(limit=2, state_file=state_file)
+            ticket = first.acquire()
+            self.assertEqual(second.stats()['in_flight'], 1)
+            second.release(second.acquire(), Response(429))
+            self.assertEqual(first.stats()['limit'], 1.0)
+            first.release(ticket, Response(200))
+
+            # A slot held by a process which died is given back
+            ready = multiprocessing.Event()
+            process = multiprocessing.Process(target=hold_slot, args=(state_file, ready))
+            process.start()
+            process.join()
+            self.assertTrue(ready.is_set())
+            self.assertEqual(first.stats()['in_flight'], 1)
+            first.release(first.acquire(), Response(200))
+            self.assertEqual(first.stats()['in_flight'], 0)
+            first.close()
+            second.close()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_client_adapts_to_service_limit(self):
+        state = {'in_flight': 0, 'peak': 0}
+        service = MockService(handler_class(LimitedRequestHandler, state=state),
+                              threaded=True)
+        limiter = RateLimiter(limit=8, max_limit=8)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        limiter=limiter,
+                                        retry=RetryPolicy(max_attempts=20, base_delay=0.01))
+        statuses = []
+
+        def run():
+            for index in range(10):
+                statuses.append(client.get_asset_status(str(index)).status_code)
+
+        workers = [threading.Thread(target=run) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(statuses, [200] * 80)
+        stats = limiter.stats()
+        self.assertGreater(stats['overloads'], 0)
+        self.assertLess(stats['limit'], 8)
+        self.assertEqual(stats['in_flight'], 0)
+        client.close()
+        service.stop()
@@ -0,0 +1,101 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.renders import RenderError, render_key
+
+from .test_client import MockService, handler_class
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    renders = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        render = json.loads(body.decode('utf-8'))
+        # Slow enough for concurrent submissions to overlap
+        time.sleep(0.05)
+        with self.lock:
+            self.renders.append(render)
+            render_id = 'render-%d' % len(self.renders)
+
+        if render['src'] == 'invalid':
+            self.reply(400, {})
+        else:
+            self.reply(200, {'id': render_id})
+
+    def reply(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class RendersTestCase(unittest.TestCase):
+    def test_render_key(self):
+        self.assertEqual(render_key('t', {'b': 1}, {'x': 2.0, 'y': [1]}),
+                         render_key('t', b'{"b": 1.0}', b'{"y": [1], "x": 2}'))
+        self.assertNotEqual(render_key('t', None, {'x': 1}), render_key('t', {'x': 1}, None))
+        self.assertNotEqual(render_key('t', vars_={'x': 1}), render_key('u', vars_={'x': 1}))
+
+    def test_ensure_render(self):
+        renders = []
+        handler = handler_class(RenderRequestHandler, renders=renders)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        render_ttl=0.5)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            client.ensure_render('template', vars_={'title': 'a'}))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['render-1'] * 4)
+        self.assertEqual(client.ensure_render('template', vars_=b'{"title": "a"}'), 'render-1')
+        self.assertEqual(client.ensure_render('template', vars_={'title': 'b'}), 'render-2')
+        self.assertRaises(RenderError, client.ensure_render, 'invalid')
+
+        # Expired renders are submitted again
+        time.sleep(0.6)
+        self.assertEqual(client.ensure_render('template', vars_={'title': 'a'}), 'render-4')
+        self.assertEqual(len(renders), 4)
+        client.close()
+        service.stop()
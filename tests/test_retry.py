@@ -0,0 +1,145 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.retry import HedgePolicy, RetryPolicy
+
+from .test_client import MockService, handler_class
+
+class FlakyRequestHandler(BaseHTTPRequestHandler):
+    """Fails the first failures requests, then stalls one in every slow_every requests"""
+
+    protocol_version = 'HTTP/1.1'
+    # Python 2 writes the status line and headers separately: without this, Nagle's
+    # algorithm holds each response back for a delayed ACK
+    disable_nagle_algorithm = True
+    failures = 0
+    slow_every = 0
+    calls = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        self.answer()
+
+    def do_PATCH(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.answer()
+
+    def answer(self):
+        with self.lock:
+            self.calls.append(self.path)
+            call = len(self.calls)
+
+        if call <= self.failures:
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+        else:
+            if self.slow_every and call % self.slow_every == 0:
+                time.sleep(1.0)
+
+            self.send_response(200)
+
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class RetryTestCase(unittest.TestCase):
+    def test_backoff(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+        for attempt in range(1, 6):
+            self.assertTrue(0 <= policy.backoff(attempt) <= min(3.0, 2 ** attempt))
+
+        response = type('Response', (object,), {'headers': {'Retry-After': '7'}})()
+        self.assertEqual(policy.backoff(1, response), 7.0)
+
+    def test_retry_idempotent(self):
+        calls = []
+        handler = handler_class(FlakyRequestHandler, calls=calls, failures=2)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+
+        self.assertEqual(client.patch_asset('asset', 1, b'data').status_code, 200)
+        self.assertEqual(calls, ['/asset/asset/1'] * 3)
+        service.stop()
+
+    def test_no_retry_post(self):
+        calls = []
+        handler = handler_class(FlakyRequestHandler, calls=calls, failures=1)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        retry=RetryPolicy(max_attempts=3, base_delay=0.01))
+
+        self.assertEqual(client.post_asset(b'data').status_code, 503)
+        self.assertEqual(len(calls), 1)
+        service.stop()
+
+    def test_deadline(self):
+        calls = []
+        handler = handler_class(FlakyRequestHandler, calls=calls, failures=100)
+        service = MockService(handler, threaded=True)
+        policy = RetryPolicy(max_attempts=100, base_delay=0.1, max_delay=0.1, deadline=0.5)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        retry=policy)
+
+        start = time.time()
+        self.assertEqual(client.get_render_status('render').status_code, 503)
+        self.assertLess(time.time() - start, 1.0)
+        self.assertLess(len(calls), 100)
+        service.stop()
+
+    def test_hedge(self):
+        calls = []
+        handler = handler_class(FlakyRequestHandler, calls=calls, slow_every=25)
+        service = MockService(handler, threaded=True)
+        hedge = HedgePolicy(percentile=90.0, min_samples=10)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url,
+                                        hedge=hedge)
+
+        start = time.time()
+        for index in range(40):
+            self.assertEqual(client.get_asset_status(str(index)).status_code, 200)
+
+        # The stalled 25th request is answered by its hedge
+        self.assertLess(time.time() - start, 1.0)
+        stats = hedge.stats()
+        self.assertEqual(stats['requests'], 40)
+        self.assertGreaterEqual(stats['hedge_wins'], 1)
+        self.assertLessEqual(stats['hedge_wins'], stats['hedged'])
+        client.close()
+        service.stop()
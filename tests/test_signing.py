@@ -0,0 +1,73 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import os
+import time
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import ECC, RSA
+import unittest2 as unittest
+
+from verylargebits.signing import ED25519_SHA256, LocalSigner, ProcessPoolSigner, \
+    load_private_key
+
+from .test_client import write_private_key
+
+class SigningTestCase(unittest.TestCase):
+    def test_process_pool_signer(self):
+        private_key = RSA.generate(1024)
+        local = LocalSigner(private_key)
+        pool = ProcessPoolSigner(private_key, processes=2)
+        try:
+            for data in (b'', b'GET/assets/abc', b'x' * 100000):
+                self.assertEqual(pool.sign(SHA256.new(data)), local.sign(SHA256.new(data)))
+        finally:
+            pool.close()
+
+    def test_ed25519_process_pool_signer(self):
+        # Ed25519 signatures are deterministic, so the pool must match exactly
+        private_key = ECC.generate(curve='ed25519')
+        local = LocalSigner(private_key)
+        pool = ProcessPoolSigner(private_key, processes=1)
+        try:
+            self.assertEqual((local.algorithm, pool.algorithm), (ED25519_SHA256, ED25519_SHA256))
+            digest = SHA256.new(b'GET/assets/abc')
+            self.assertEqual(pool.sign(digest), local.sign(digest))
+        finally:
+            pool.close()
+
+    def test_load_private_key(self):
+        filename = write_private_key(RSA.generate(1024))
+        try:
+            private_key = load_private_key(filename)
+            self.assertIs(load_private_key(filename), private_key)
+
+            # A replaced key file is parsed again
+            replacement = RSA.generate(1024)
+            with open(filename, 'wb') as file_:
+                file_.write(replacement.exportKey('PEM'))
+
+            os.utime(filename, (time.time() + 10, time.time() + 10))
+            self.assertEqual(load_private_key(filename).n, replacement.n)
+        finally:
+            os.remove(filename)
@@ -0,0 +1,124 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import os
+import tempfile
+import threading
+import time
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.templates import DiskTemplateStore, MemoryTemplateStore, TemplateError, \
+    template_hash
+
+from .test_client import MockService, handler_class
+
+class TemplateRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    templates = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        template = json.loads(body.decode('utf-8'))
+        # Slow enough for concurrent posts to overlap
+        time.sleep(0.05)
+        with self.lock:
+            self.templates.append(template)
+            template_id = 'template-%d' % len(self.templates)
+
+        if 'invalid' in template:
+            self.reply(400, {})
+        else:
+            self.reply(200, {'id': template_id})
+
+    def reply(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class TemplatesTestCase(unittest.TestCase):
+    def test_template_hash(self):
+        self.assertEqual(template_hash({'a': 1, 'b': [2.0, {'c': -0.0}]}),
+                         template_hash(b'{ "b": [2, {"c": 0}], "a": 1.0 }'))
+        self.assertNotEqual(template_hash({'a': 1}), template_hash({'a': 1.5}))
+        self.assertNotEqual(template_hash({'a': 1}), template_hash({'a': '1'}))
+
+    def test_memory_store_eviction(self):
+        store = MemoryTemplateStore(max_entries=2)
+        store.set('a', '1')
+        store.set('b', '2')
+        store.get('a')
+        store.set('c', '3')
+        self.assertEqual((store.get('a'), store.get('b'), store.get('c')), ('1', None, '3'))
+
+    def test_disk_store(self):
+        file_, filename = tempfile.mkstemp(suffix='.db')
+        os.close(file_)
+        with DiskTemplateStore(filename, max_entries=2) as store:
+            store.set('a', '1')
+            store.set('b', '2')
+            store.set('c', '3')
+            self.assertEqual(len(store), 2)
+            self.assertIsNone(store.get('a'))
+
+        with DiskTemplateStore(filename) as store:
+            self.assertEqual((store.get('b'), store.get('c')), ('2', '3'))
+            self.assertEqual(store.pop('b'), '2')
+            self.assertIsNone(store.get('b'))
+
+        os.remove(filename)
+
+    def test_ensure_template(self):
+        templates = []
+        handler = handler_class(TemplateRequestHandler, templates=templates)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            client.ensure_template({'layers': [1.0], 'name': 'x'}))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, ['template-1'] * 4)
+        self.assertEqual(client.ensure_template(b'{"name": "x", "layers": [1]}'), 'template-1')
+        self.assertEqual(client.ensure_template({'name': 'y'}), 'template-2')
+        self.assertRaises(TemplateError, client.ensure_template, {'invalid': True})
+        self.assertEqual(len(templates), 3)
+        client.close()
+        service.stop()
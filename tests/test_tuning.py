@@ -0,0 +1,89 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import os
+import shutil
+import tempfile
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.tuning import (AUTO, MIN_PATCH_SIZE, LinkEstimate, ThroughputHistory,
+                                  plan_upload)
+
+from .test_client import MockService, handler_class
+from .test_journal import JournalRequestHandler
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+class TuningTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_plan_upload(self):
+        slow = plan_upload(10 * GB, LinkEstimate(1 * MB, 0.05), memory_budget=GB)
+        fast = plan_upload(10 * GB, LinkEstimate(100 * MB, 0.05), memory_budget=GB)
+        far = plan_upload(10 * GB, LinkEstimate(100 * MB, 0.5), memory_budget=GB)
+
+        self.assertEqual(slow.patch_size, 1 * MB)
+        self.assertEqual(fast.patch_size, 100 * MB)
+        self.assertGreater(far.patch_size, fast.patch_size)
+        self.assertLessEqual(far.patch_size * far.max_in_flight, GB)
+
+        tight = plan_upload(10 * GB, LinkEstimate(100 * MB, 0.5), memory_budget=64 * MB)
+        self.assertLessEqual(tight.patch_size * tight.max_in_flight, 64 * MB)
+
+        small = plan_upload(100 * 1024, LinkEstimate(100 * MB, 0.05))
+        self.assertEqual(small.patch_size, MIN_PATCH_SIZE)
+
+    def test_throughput_history(self):
+        history = ThroughputHistory(os.path.join(self.directory, 'history.json'))
+        self.assertIsNone(history.estimate('https://api.verylargebits.com'))
+
+        history.record('https://api.verylargebits.com', bandwidth=10 * MB, rtt=0.1)
+        history.record('https://api.verylargebits.com', bandwidth=20 * MB)
+        estimate = history.estimate('https://api.verylargebits.com')
+        self.assertAlmostEqual(estimate.bandwidth, 13 * MB)
+        self.assertAlmostEqual(estimate.rtt, 0.1)
+
+    def test_upload_file_auto(self):
+        filename = os.path.join(self.directory, 'movie.mp4')
+        data = os.urandom(MIN_PATCH_SIZE * 3)
+        with open(filename, 'wb') as file_:
+            file_.write(data)
+
+        patches = {}
+        requests = []
+        history = ThroughputHistory(os.path.join(self.directory, 'history.json'))
+        handler = handler_class(JournalRequestHandler, patches=patches, requests=requests)
+        service = MockService(handler, threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        client.upload_file(filename, patch_size=AUTO, history=history)
+
+        self.assertEqual(b''.join(patches[index] for index in sorted(requests)), data)
+        self.assertGreater(history.estimate(service.url).bandwidth, 0)
+        service.stop()
@@ -0,0 +1,168 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from base64 import b64decode
+from http.server import BaseHTTPRequestHandler
+import io
+import json
+import os
+import tempfile
+import threading
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.hashing import calc_sha1
+from verylargebits.spool import Spool
+from verylargebits.upload import MappedFile, UploadError
+
+from .test_client import MockService, handler_class
+
+class AssetRequestHandler(BaseHTTPRequestHandler):
+    """Stores the patches of a single asset in the class-level patches dict"""
+
+    patches = None
+    fail_patch = None
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        with self.lock:
+            if self.headers['Content-Type'] == 'application/octet-stream':
+                self.patches[0] = body
+            else:
+                body = json.loads(body.decode('utf-8'))
+                self.patches[0] = b64decode(body['data'])
+                self.patches['hash'] = body['hash']
+                self.patches['patch_count'] = body['patch_count']
+
+        self.reply(200, {'id': 'l3pgbkpbcm5l41kt4tdgf2x4jq'})
+
+    def do_PATCH(self):
+        patch_index = int(self.path.split('/')[-1])
+        data = self.rfile.read(int(self.headers['Content-Length']))
+        if patch_index == self.fail_patch:
+            self.reply(500, {})
+            return
+
+        with self.lock:
+            self.patches[patch_index] = data
+
+        self.reply(200, {})
+
+    def reply(self, status, value):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(json.dumps(value).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class UploadTestCase(unittest.TestCase):
+    def setUp(self):
+        file_, self.filename = tempfile.mkstemp()
+        self.data = os.urandom(1000)
+        os.write(file_, self.data)
+        os.close(file_)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def test_upload_file(self):
+        patches = {}
+        progress = []
+        service = MockService(handler_class(AssetRequestHandler, patches=patches))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        asset_id = client.upload_file(self.filename, patch_size=300, max_in_flight=3,
+                                      progress=lambda *args: progress.append(args))
+
+        self.assertEqual(asset_id, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(patches['hash'], calc_sha1(self.filename))
+        self.assertEqual(patches['patch_count'], 3)
+        self.assertEqual(b''.join(patches[i] for i in range(4)), self.data)
+        self.assertEqual(sorted(progress), [(0, 4, 300), (1, 4, 300), (2, 4, 300), (3, 4, 100)])
+        service.stop()
+
+    def test_upload_file_patch_error(self):
+        service = MockService(handler_class(AssetRequestHandler, patches={}, fail_patch=2))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        with self.assertRaises(UploadError) as context:
+            client.upload_file(self.filename, patch_size=300, max_buffered_bytes=300)
+
+        self.assertEqual(context.exception.patch_index, 2)
+        self.assertEqual(context.exception.response.status_code, 500)
+        service.stop()
+
+    def test_upload_stream(self):
+        # Once held in memory, once spilled to disk after the first 512 bytes
+        for spool_memory in (4096, 512):
+            patches = {}
+            service = MockService(handler_class(AssetRequestHandler, patches=patches))
+            client = Client.from_basic_auth('test', 'password', service_url=service.url)
+            read_fd, write_fd = os.pipe()
+            writer = threading.Thread(target=lambda: (os.write(write_fd, self.data),
+                                                      os.close(write_fd)))
+            writer.start()
+            with os.fdopen(read_fd, 'rb') as pipe:
+                asset_id = client.upload_stream(pipe, patch_size=300, max_in_flight=2,
+                                                spool_memory=spool_memory)
+
+            writer.join()
+            self.assertEqual(asset_id, 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+            self.assertEqual(patches['hash'], calc_sha1(self.filename))
+            self.assertEqual(b''.join(patches[i] for i in range(4)), self.data)
+            service.stop()
+
+    def test_spool(self):
+        with Spool(max_memory=10) as spool:
+            spool.write(b'01234')
+            self.assertFalse(spool.spilled)
+            spool.fill(io.BytesIO(b'56789abcdef'), read_size=4)
+            self.assertTrue(spool.spilled)
+            self.assertEqual(spool.size, 16)
+            with spool.mapped() as mapped:
+                self.assertEqual(mapped.patch(1, 10).tobytes(), b'abcdef')
+
+    def test_mapped_file_patches(self):
+        with MappedFile(self.filename) as mapped:
+            self.assertEqual(mapped.size, 1000)
+            patch = mapped.patch(3, 300)
+            self.assertIsInstance(patch, memoryview)
+            self.assertEqual(patch.tobytes(), self.data[900:])
+            mapped.release(3, 300)
+            self.assertEqual(mapped.patch(3, 300).tobytes(), self.data[900:])
+            del patch
+
+    def test_upload_empty_file(self):
+        open(self.filename, 'wb').close()
+        patches = {}
+        service = MockService(handler_class(AssetRequestHandler, patches=patches))
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+
+        self.assertEqual(client.upload_file(self.filename), 'l3pgbkpbcm5l41kt4tdgf2x4jq')
+        self.assertEqual(patches, {0: b''})
+        service.stop()
@@ -0,0 +1,107 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from future import standard_library
+standard_library.install_aliases()
+
+from http.server import BaseHTTPRequestHandler
+import json
+import threading
+
+import unittest2 as unittest
+
+from verylargebits.client import Client
+from verylargebits.watch import RenderWatcher
+
+from .test_client import MockService, handler_class
+
+class StatusRequestHandler(BaseHTTPRequestHandler):
+    """Reports a render as RENDERING for as many polls as its id says, then DONE"""
+
+    polls = None
+    lock = threading.Lock()
+
+    def do_GET(self):
+        render_id = self.path.split('/')[2]
+        with self.lock:
+            self.polls[render_id] = self.polls.get(render_id, 0) + 1
+            count = self.polls[render_id]
+
+        if render_id == 'missing':
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        status = 'DONE' if count > int(render_id) else 'RENDERING'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.end_headers()
+        self.wfile.write(json.dumps({'status': status}).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+class WatchTestCase(unittest.TestCase):
+    def test_render_watcher(self):
+        polls = {}
+        service = MockService(handler_class(StatusRequestHandler, polls=polls),
+                              threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+
+        with RenderWatcher(client, min_interval=0.01, max_interval=0.05,
+                           max_wait=0.5) as watcher:
+            for render_id in ('0', '3', '1', 'missing'):
+                watcher.add(render_id)
+
+            completions = dict((completion.render_id, completion.status)
+                               for completion in watcher)
+
+        self.assertEqual(completions, {'0': 'DONE', '1': 'DONE', '3': 'DONE', 'missing': None})
+        self.assertEqual(len(watcher), 0)
+        self.assertEqual((polls['0'], polls['1'], polls['3']), (1, 2, 4))
+        service.stop()
+
+    def test_render_watcher_callback(self):
+        service = MockService(handler_class(StatusRequestHandler, polls={}), threaded=True)
+        client = Client.from_basic_auth('test', 'password', service_url=service.url)
+        callbacks = []
+        finished = threading.Event()
+
+        def callback(completion):
+            callbacks.append(completion.render_id)
+            if len(callbacks) == 3:
+                finished.set()
+
+        with RenderWatcher(client, callback=callback, min_interval=0.01,
+                           max_interval=0.05) as watcher:
+            for render_id in ('0', '2', '1'):
+                watcher.add(render_id)
+
+            self.assertTrue(finished.wait(5.0))
+            with self.assertRaises(ValueError):
+                next(iter(watcher))
+
+        # Completions are not kept once they are delivered to the callback
+        self.assertEqual(sorted(callbacks), ['0', '1', '2'])
+        self.assertTrue(watcher.completed.empty())
+        service.stop()
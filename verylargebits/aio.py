@@ -0,0 +1,202 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    raise ImportError('"aiohttp" package not found: pip install verylargebits[async]')
+
+from verylargebits.body import body_length
+from verylargebits.client import (POOL_CONNECTIONS_DEFAULT, POOL_MAXSIZE_DEFAULT,
+                                  SERVICE_URL_DEFAULT, BaseClient, BasicAuthClient,
+                                  SignatureAuthClient)
+from verylargebits.codec import default_codec
+
+class AsyncResponse(object):
+    """The status, headers and body of a completed AsyncClient request
+
+    Mirrors the parts of requests.Response that callers of Client use; json() decodes
+    with codec, by default the one a Client would use."""
+
+    def __init__(self, status_code, headers, content, reason=None, codec=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.reason = reason
+        self.codec = codec if codec is not None else default_codec()
+
+    def __repr__(self):
+        return '<AsyncResponse [%d]>' % self.status_code
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return self.codec.loads(self.content)
+
+class _AsyncChunks(object):
+    """Async iterator over request body chunks; file reads run in the default executor"""
+
+    def __init__(self, chunks, loop):
+        self._chunks = iter(chunks)
+        self._blocking = getattr(chunks, 'blocking', False)
+        self._loop = loop
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._blocking:
+            chunk = await self._loop.run_in_executor(None, next, self._chunks, None)
+        else:
+            chunk = next(self._chunks, None)
+
+        if chunk is None:
+            raise StopAsyncIteration
+
+        return bytes(chunk) if isinstance(chunk, memoryview) else chunk
+
+class AsyncClient(BaseClient):
+    """asyncio REST Client for the Very Large Bits API
+
+    Has the same endpoint methods and auth providers as Client, as coroutines returning
+    AsyncResponse objects. All requests share one aiohttp connection pool of up to
+    pool_connections * pool_maxsize connections, at most pool_maxsize of them to one
+    host, kept alive for keepalive_timeout seconds. max_concurrency, if given, bounds
+    the number of requests in flight; later requests wait for a free slot.
+
+    Signatures are computed in the default executor so RSA work does not stall the event
+    loop; basic auth headers are computed inline."""
+
+    def __init__(self, auth_impl, service_url, pool_connections=POOL_CONNECTIONS_DEFAULT,
+                 pool_maxsize=POOL_MAXSIZE_DEFAULT, keepalive_timeout=15.0,
+                 max_concurrency=None, timeout=None, codec=None):
+        super(AsyncClient, self).__init__(auth_impl, service_url, codec)
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keepalive_timeout = keepalive_timeout
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @classmethod
+    def from_basic_auth(cls, email, password, service_url=SERVICE_URL_DEFAULT, **kwargs):
+        return cls(BasicAuthClient(email, password), service_url, **kwargs)
+
+    @classmethod
+    def from_sig_auth(cls, api_key, private_key_filename, service_url=SERVICE_URL_DEFAULT,
+                      signing_processes=None, **kwargs):
+        auth_impl = SignatureAuthClient(api_key, private_key_filename,
+                                        signing_processes=signing_processes)
+
+        return cls(auth_impl, service_url, **kwargs)
+
+    @property
+    def session(self):
+        """Returns the pooled aiohttp session, creating it on the running event loop"""
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_connections * self.pool_maxsize,
+                                             limit_per_host=self.pool_maxsize,
+                                             keepalive_timeout=self.keepalive_timeout)
+            timeout = self.timeout
+            if timeout is not None and not isinstance(timeout, aiohttp.ClientTimeout):
+                timeout = aiohttp.ClientTimeout(total=timeout)
+
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            if self.max_concurrency is not None:
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        return self._session
+
+    async def close(self):
+        """Closes every pooled connection; the next request opens a new pool"""
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if hasattr(self.auth_impl, 'close'):
+            self.auth_impl.close()
+
+    async def _send(self, request):
+        session = self.session
+        if self._semaphore is None:
+            return await self._send_now(session, request)
+
+        async with self._semaphore:
+            return await self._send_now(session, request)
+
+    async def _send_now(self, session, request):
+        loop = asyncio.get_event_loop()
+        if isinstance(self.auth_impl, BasicAuthClient):
+            self.authorize(request)
+        else:
+            await loop.run_in_executor(None, self.authorize, request)
+
+        chunks = request.chunks
+        if chunks is None or (isinstance(chunks, list) and len(chunks) == 1):
+            data = chunks[0] if chunks else None
+        else:
+            request.headers['Content-Length'] = str(body_length(chunks))
+            data = _AsyncChunks(chunks, loop)
+
+        response = await session.request(request.verb, self.service_url + request.sub_url,
+                                         headers=request.headers, data=data)
+        try:
+            content = await response.read()
+        finally:
+            response.release()
+
+        return AsyncResponse(response.status, response.headers, content, response.reason,
+                             self.codec)
+
+    async def get_asset_status(self, sha1):
+        return await self._send(self._asset_status_request(sha1))
+
+    async def get_render_status(self, render_id):
+        return await self._send(self._render_status_request(render_id))
+
+    async def patch_asset(self, asset_id, patch_index, data):
+        return await self._send(self._patch_asset_request(asset_id, patch_index, data))
+
+    async def post_asset(self, data, sha1=None, patch_count=0):
+        return await self._send(self._post_asset_request(data, sha1, patch_count))
+
+    async def post_render(self, template_id, storage=None, vars_=None, wait_until=None,
+                          wait_secs=None):
+        return await self._send(self._post_render_request(template_id, storage, vars_,
+                                                          wait_until, wait_secs))
+
+    async def post_template(self, template):
+        return await self._send(self._post_template_request(template))
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from verylargebits.codec import encoded
+from verylargebits.concurrency import bounded_map
+
+# Batch defaults
+CONCURRENCY_DEFAULT = 8
+
+class RenderResult(object):
+    """The outcome of one render of a post_renders() batch
+
+    index is the position of vars_ in the input. Exactly one of response (the HTTP
+    response, whatever its status) and error (the exception raised while sending) is
+    set."""
+
+    def __init__(self, index, vars_, response=None, error=None):
+        self.index = index
+        self.vars_ = vars_
+        self.response = response
+        self.error = error
+
+    def __repr__(self):
+        return '<RenderResult [%d] %s>' % (self.index, self.error or self.response)
+
+    @property
+    def ok(self):
+        """True if the render was accepted by the service"""
+
+        return self.error is None and self.response.status_code == 200
+
+    @property
+    def render_id(self):
+        """The id of the new render, or None if it was not accepted"""
+
+        return self.response.json()['id'] if self.ok else None
+
+def post_renders(client, template_id, vars_iterable, storage=None,
+                 concurrency=CONCURRENCY_DEFAULT, ordered=False):
+    """Submits one render of template_id per vars_ dict and yields RenderResult objects
+
+    See Client.post_renders()."""
+
+    # storage is the same for every render, so it is encoded once
+    if storage is not None:
+        storage = encoded(storage, client.codec)
+
+    def post_render(vars_):
+        return client.post_render(template_id, storage=storage, vars_=vars_)
+
+    for index, vars_, future in bounded_map(post_render, vars_iterable, concurrency, ordered):
+        try:
+            result = RenderResult(index, vars_, response=future.result())
+        except Exception as error:
+            result = RenderResult(index, vars_, error=error)
+
+        yield result
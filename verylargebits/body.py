@@ -0,0 +1,215 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import base64
+import json
+import os
+import threading
+
+# Size of the pieces a streamed body is read and hashed in
+CHUNK_SIZE_DEFAULT = 1024 * 1024
+
+# Bytes base64 encoded at a time; a multiple of 3 so no block needs padding
+ENCODE_SIZE = 3 * 64 * 1024
+
+def as_buffer(data):
+    """Returns bytes unchanged and any other buffer-protocol object as a flat byte view
+
+    Views share memory with the original object (e.g. a slice of an mmap), so bodies can
+    be hashed and sent without being copied."""
+
+    if data is None or isinstance(data, bytes):
+        return data
+
+    view = memoryview(data)
+    if view.format != 'B' or view.ndim != 1:
+        # Python 2 views cannot be cast; they are copied instead
+        view = view.cast('B') if hasattr(view, 'cast') else memoryview(view.tobytes())
+
+    return view
+
+def _as_bytes(data):
+    # bytes() of a memoryview is its repr on Python 2
+    return data if isinstance(data, bytes) else memoryview(data).tobytes()
+
+class FileRegion(object):
+    """A byte range of an open file, iterated as chunks read on demand
+
+    Iterating a region twice reads it twice, so a request body can be hashed and then
+    sent while holding only one chunk in memory. Reads use os.pread() where available so
+    regions of one file may be iterated from several threads at once."""
+
+    # Iterating reads from disk
+    blocking = True
+
+    def __init__(self, file_, offset, length, chunk_size=CHUNK_SIZE_DEFAULT):
+        self.file = file_
+        self.offset = offset
+        self.length = length
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        position = self.offset
+        end = self.offset + self.length
+        while position < end:
+            chunk = self._read(position, min(self.chunk_size, end - position))
+            if not chunk:
+                raise IOError('Unexpected end of file at offset %d' % position)
+
+            position += len(chunk)
+            yield chunk
+
+    def _read(self, position, size):
+        if hasattr(os, 'pread'):
+            return os.pread(self.file.fileno(), size, position)
+
+        with self._lock:
+            self.file.seek(position)
+            return self.file.read(size)
+
+def body_chunks(data):
+    """Returns a re-iterable sequence of byte chunks for a request body
+
+    data may be bytes or any buffer-protocol object, a FileRegion, a seekable file object
+    (sent from its current position to the end), or an iterable of buffers such as a
+    generator. One-shot iterables and unseekable files are consumed once and their chunks
+    kept so the chunks that were hashed are the ones that are sent."""
+
+    if isinstance(data, FileRegion):
+        return data
+
+    try:
+        return [as_buffer(data)]
+    except TypeError:
+        pass
+
+    if hasattr(data, 'read'):
+        try:
+            offset = data.tell()
+            length = os.fstat(data.fileno()).st_size - offset
+        except (AttributeError, IOError, OSError, ValueError):
+            return list(iter(lambda: data.read(CHUNK_SIZE_DEFAULT), b''))
+
+        return FileRegion(data, offset, length)
+
+    return [as_buffer(chunk) for chunk in data]
+
+def body_length(chunks):
+    """Returns the total number of bytes in a chunk sequence such as body_chunks() returns"""
+
+    if isinstance(chunks, list):
+        return sum(len(chunk) for chunk in chunks)
+
+    return len(chunks)
+
+class JsonAssetBody(object):
+    """The JSON body of a multi-patch post_asset, generated as a stream of chunks
+
+    Produces the same document as json.dumps({'data': ..., 'hash': ..., 'patch_count':
+    ...}) with data base64 encoded, but encodes ENCODE_SIZE bytes at a time straight
+    from the source chunks. Like FileRegion it can be iterated again, so the body is
+    hashed and then sent without ever being held in memory; its length is known up
+    front."""
+
+    def __init__(self, chunks, sha1, patch_count):
+        self._chunks = chunks
+        self._data_length = body_length(chunks)
+        self._prefix = b'{"data": "'
+        self._suffix = ('", "hash": ' + json.dumps(sha1) + ', "patch_count": '
+                        + json.dumps(patch_count) + '}').encode('utf-8')
+
+    @property
+    def blocking(self):
+        return getattr(self._chunks, 'blocking', False)
+
+    def __len__(self):
+        encoded_length = (self._data_length + 2) // 3 * 4
+
+        return len(self._prefix) + encoded_length + len(self._suffix)
+
+    def __iter__(self):
+        yield self._prefix
+
+        carry = b''
+        for chunk in self._chunks:
+            chunk = as_buffer(chunk)
+            offset = 0
+            if carry:
+                # Complete the 3 byte group left over from the previous chunk
+                offset = min(len(chunk), 3 - len(carry))
+                carry += _as_bytes(chunk[:offset])
+                if len(carry) < 3:
+                    continue
+
+                yield base64.b64encode(carry)
+                carry = b''
+
+            end = offset + (len(chunk) - offset) // 3 * 3
+            while offset < end:
+                block_end = min(end, offset + ENCODE_SIZE)
+                yield base64.b64encode(chunk[offset:block_end])
+                offset = block_end
+
+            carry = _as_bytes(chunk[end:])
+
+        if carry:
+            yield base64.b64encode(carry)
+
+        yield self._suffix
+
+class StreamBody(object):
+    """A read-only file object over a sequence of chunks, with a known length
+
+    Handing one of these to requests sends the chunks with a Content-Length header
+    instead of chunked transfer encoding, without joining them into one bytes object."""
+
+    def __init__(self, chunks, length=None):
+        self._chunks = iter(chunks)
+        self._length = body_length(chunks) if length is None else length
+        self._current = memoryview(b'')
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            parts = [self._current.tobytes()] if len(self._current) else []
+            parts.extend(_as_bytes(chunk) for chunk in self._chunks)
+            self._current = memoryview(b'')
+            data = b''.join(parts)
+        else:
+            while not len(self._current):
+                try:
+                    # A view, so that taking each read off the front never copies the rest
+                    self._current = memoryview(as_buffer(next(self._chunks)))
+                except StopIteration:
+                    return b''
+
+            data = self._current[:size].tobytes()
+            self._current = self._current[size:]
+
+        return data
@@ -22,20 +22,27 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
 
 import base64
-import Crypto
-from Crypto.PublicKey import RSA
-from Crypto.Signature import PKCS1_v1_5
-from Crypto.Hash import SHA256
-import json
-
-try:
-    import requests
-except ImportError:
-    raise ImportError('"requests" package not found: see requirements.txt')
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import os
+import threading
+import time
+
+from verylargebits import batch, lookup, renders, spool, tuning
+from verylargebits.body import JsonAssetBody, StreamBody, body_chunks, body_length
+from verylargebits.codec import default_codec, encoded
+from verylargebits.hashing import calc_sha1
+from verylargebits.metrics import Hooks, RequestEvent, Trace
+from verylargebits.retry import IDEMPOTENT_ENDPOINTS, RetryPolicy
+from verylargebits.templates import TemplateCache
+from verylargebits.upload import MAX_IN_FLIGHT_DEFAULT, PATCH_SIZE_DEFAULT, Uploader
 
 # Configuration file keys and defaults
 SERVICE_URL_DEFAULT = 'https://api.verylargebits.com'
 
+# Connection pool defaults
+POOL_CONNECTIONS_DEFAULT = 10
+POOL_MAXSIZE_DEFAULT = 10
+
 class BasicAuthClient(object):
     """An authentication provider using the email and password method"""
 
@@ -46,97 +53,98 @@ class BasicAuthClient(object):
     def auth_value(self, verb, url, body=None):
         """Returns the Authorization header value for the given arguments"""
 
-        del verb, url, body
+        return self.auth_value_iter(verb, url, None if body is None else [body])
+
+    def auth_value_iter(self, verb, url, chunks=None):
+        """Returns the Authorization header value for a body given as chunks"""
+
+        del verb, url, chunks
         creds = self._email + ':' + self._password
 
         return 'Basic ' + base64.urlsafe_b64encode(creds.encode('utf-8')).decode('utf-8')
 
-class Client(object):
-    """REST Client for the Very Large Bits API"""
+class ApiRequest(object):
+    """A Very Large Bits API request, before it is authorized and sent
+
+    endpoint names the client method that built it; chunks is the body as returned by
+    body_chunks(), or None. While a client is instrumented, traces collects a Trace per
+    send and retries counts the sends retried."""
+
+    def __init__(self, endpoint, verb, sub_url, headers=None, chunks=None):
+        self.endpoint = endpoint
+        self.verb = verb
+        self.sub_url = sub_url
+        self.headers = headers if headers is not None else {}
+        self.chunks = chunks
+        self.traces = None
+        self.retries = 0
 
-    def __init__(self, auth_impl, service_url):
+class BaseClient(object):
+    """Builds and authorizes Very Large Bits API requests; subclasses send them
+
+    Request bodies are encoded, and responses may be decoded with json(), by codec: by
+    default the fastest JsonCodec available."""
+
+    def __init__(self, auth_impl, service_url, codec=None):
         self.auth_impl = auth_impl
+        self.codec = codec if codec is not None else default_codec()
         if service_url == None:
             self.service_url = SERVICE_URL_DEFAULT
         else:
             self.service_url = service_url
 
-    @classmethod
-    def from_basic_auth(cls, email, password, service_url=SERVICE_URL_DEFAULT):
-        return Client(BasicAuthClient(email, password), service_url)
+    def json(self, response):
+        """Returns the decoded JSON body of the given response"""
 
-    @classmethod
-    def from_sig_auth(cls, api_key, private_key_filename, service_url=SERVICE_URL_DEFAULT):
-        return Client(SignatureAuthClient(api_key, private_key_filename), service_url)
+        return self.codec.loads(response.content)
 
-    def get_asset_status(self, sha1):
-        sub_url = '/assets/' + sha1
-        full_url = self.service_url + sub_url
-        headers = {
-            'Authorization': self.auth_impl.auth_value('GET', sub_url, None),
-        }
+    def authorize(self, request):
+        """Adds the Authorization header to the given request"""
 
-        return requests.get(full_url, headers=headers)
+        request.headers['Authorization'] = self.auth_impl.auth_value_iter(
+            request.verb, request.sub_url, request.chunks)
 
-    def get_render_status(self, render_id):
-        sub_url = '/render/' + render_id + '/status'
-        full_url = self.service_url + sub_url
-        headers = {
-            'Authorization': self.auth_impl.auth_value('GET', sub_url, None),
-        }
+    def _asset_status_request(self, sha1):
+        return ApiRequest('get_asset_status', 'GET', '/assets/' + sha1)
 
-        return requests.get(full_url, headers=headers)
+    def _render_status_request(self, render_id):
+        return ApiRequest('get_render_status', 'GET', '/render/' + render_id + '/status')
 
-    def patch_asset(self, asset_id, patch_index, data):
+    def _patch_asset_request(self, asset_id, patch_index, data):
         sub_url = '/asset/' + asset_id + '/' + str(patch_index)
-        full_url = self.service_url + sub_url
         headers = {
-            'Authorization': self.auth_impl.auth_value('PATCH', sub_url, data),
             'Content-Type': 'application/octet-stream',
         }
 
-        return requests.patch(full_url, headers=headers, data=data)
+        return ApiRequest('patch_asset', 'PATCH', sub_url, headers, body_chunks(data))
 
-    def post_asset(self, data, sha1=None, patch_count=0):
-        sub_url = '/asset'
-        full_url = self.service_url + sub_url
-        body = None
+    def _post_asset_request(self, data, sha1, patch_count):
+        chunks = body_chunks(data)
         if patch_count == 0:
-            body = data
+            headers = {
+                'Content-Type': 'application/octet-stream',
+            }
         else:
-            body = json.dumps({
-                'data': base64.b64encode(data).decode('utf-8'),
-                'hash': sha1,
-                'patch_count': patch_count,
-            }).encode('utf-8')
+            chunks = JsonAssetBody(chunks, sha1, patch_count)
+            headers = {
+                'Content-Type': 'application/json',
+            }
 
-        headers = {
-            'Authorization': self.auth_impl.auth_value('POST', sub_url, body),
-        }
+        return ApiRequest('post_asset', 'POST', '/asset', headers, chunks)
 
-        if patch_count == 0:
-            headers['Content-Type'] = 'application/octet-stream'
-            return requests.post(full_url, headers=headers, data=body)
-        else:
-            headers['Content-Type'] = 'application/json'
-            return requests.post(full_url, headers=headers, data=body)
-
-    def post_render(self, template_id, storage=None, vars_=None, wait_until=None, wait_secs=None):
-        sub_url = '/render'
-        full_url = self.service_url + sub_url
-        body_json = {
-            'src': template_id,
-        }
+    def _post_render_request(self, template_id, storage, vars_, wait_until, wait_secs):
+        # Parts given as bytes were encoded by the caller and are spliced in as they are
+        parts = [b'{"src":', self.codec.dumps(template_id)]
 
         if storage != None:
-            body_json['storage'] = storage
+            parts += [b',"storage":', encoded(storage, self.codec)]
 
         if vars_ != None:
-            body_json['vars'] = vars_
+            parts += [b',"vars":', encoded(vars_, self.codec)]
+
+        parts.append(b'}')
 
-        body = json.dumps(body_json).encode('utf-8')
         headers = {
-            'Authorization': self.auth_impl.auth_value('POST', sub_url, body),
             'Content-Type': 'application/json',
         }
 
@@ -145,39 +153,553 @@ class Client(object):
             if wait_secs != None:
                 headers['x-wait-for'] = str(wait_secs)
 
-        return requests.post(full_url, headers=headers, data=body)
+        return ApiRequest('post_render', 'POST', '/render', headers, [b''.join(parts)])
 
-    def post_template(self, template):
-        sub_url = '/template'
-        full_url = self.service_url + sub_url
-        body = json.dumps(template).encode('utf-8')
+    def _post_template_request(self, template):
         headers = {
-            'Authorization': self.auth_impl.auth_value('POST', sub_url, body),
             'Content-Type': 'application/json',
         }
 
-        return requests.post(full_url, headers=headers, data=body)
+        return ApiRequest('post_template', 'POST', '/template', headers,
+                          [encoded(template, self.codec)])
+
+class Client(BaseClient):
+    """REST Client for the Very Large Bits API
+
+    Endpoint methods share one pooled, keep-alive HTTP session, which is safe to use
+    from many threads and is rebuilt in a child process after a fork."""
+
+    def __init__(self, auth_impl, service_url, pool_connections=POOL_CONNECTIONS_DEFAULT,
+                 pool_maxsize=POOL_MAXSIZE_DEFAULT, pool_block=False, keep_alive=True,
+                 timeout=None, status_ttl=lookup.STATUS_TTL_DEFAULT, retry=None, hedge=None,
+                 codec=None, template_store=None, render_ttl=renders.RENDER_TTL_DEFAULT,
+                 limiter=None):
+        super(Client, self).__init__(auth_impl, service_url, codec)
+        # Pools are kept for pool_connections hosts with pool_maxsize connections each;
+        # with pool_block a request waits for a free connection instead of opening a
+        # throw-away one
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        # Seconds, or a (connect, read) tuple, passed to every request
+        self.timeout = timeout
+        # Idempotent requests are sent again as a RetryPolicy says, and twice when slower
+        # than a HedgePolicy says
+        self.retry = retry
+        self.hedge = hedge
+        # Every request sent, retries and hedges included, waits for the RateLimiter
+        self.limiter = limiter
+        # Subscribers receive a RequestEvent per request; requests are only timed while
+        # something subscribes
+        self.hooks = Hooks()
+        self._asset_statuses = lookup.AssetStatusLookup(self, ttl=status_ttl)
+        self._templates = TemplateCache(self, store=template_store)
+        self._renders = renders.RenderDeduplicator(self, ttl=render_ttl)
+        self._session = None
+        self._session_pid = None
+        self._session_lock = threading.Lock()
+        self._hedge_executor = None
+        self._hedge_pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @classmethod
+    def from_basic_auth(cls, email, password, service_url=SERVICE_URL_DEFAULT, **kwargs):
+        return cls(BasicAuthClient(email, password), service_url, **kwargs)
+
+    @classmethod
+    def from_sig_auth(cls, api_key, private_key_filename, service_url=SERVICE_URL_DEFAULT,
+                      signing_processes=None, **kwargs):
+        auth_impl = SignatureAuthClient(api_key, private_key_filename,
+                                        signing_processes=signing_processes)
+
+        return cls(auth_impl, service_url, **kwargs)
+
+    @property
+    def session(self):
+        """Returns the pooled HTTP session owned by this process"""
+
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._session_lock:
+                if self._session is None or self._session_pid != pid:
+                    # A session inherited over fork() is dropped, never closed: its
+                    # sockets still belong to the parent process
+                    self._session = self._new_session()
+                    self._session_pid = pid
+
+        return self._session
+
+    def close(self):
+        """Closes every pooled connection; the next request opens a new pool"""
+
+        with self._session_lock:
+            if self._session is not None and self._session_pid == os.getpid():
+                self._session.close()
+
+            self._session = None
+            self._session_pid = None
+
+            if self._hedge_executor is not None and self._hedge_pid == os.getpid():
+                self._hedge_executor.shutdown(wait=False)
+
+            self._hedge_executor = None
+            self._hedge_pid = None
+
+        if hasattr(self.auth_impl, 'close'):
+            self.auth_impl.close()
+
+    def _new_session(self):
+        # requests is imported by the first request, not by importing this module
+        try:
+            import requests
+            from verylargebits.tracing import TracingAdapter
+        except ImportError:
+            raise ImportError('"requests" package not found: see requirements.txt')
+
+        session = requests.Session()
+        adapter = TracingAdapter(pool_connections=self.pool_connections,
+                                 pool_maxsize=self.pool_maxsize,
+                                 pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+
+        return session
+
+    @staticmethod
+    def _stream_body(chunks):
+        """Returns a request body sending the given chunks without joining them"""
+
+        if chunks is None:
+            return None
+
+        if isinstance(chunks, list) and len(chunks) == 1:
+            return chunks[0]
+
+        return StreamBody(chunks)
+
+    def _request(self, verb, sub_url, headers, body=None, timeout=None, stream=False):
+        return self.session.request(verb, self.service_url + sub_url, headers=headers,
+                                    data=body, stream=stream,
+                                    timeout=self.timeout if timeout is None else timeout)
+
+    def _call(self, build, *args):
+        """Builds a request with build(*args) and sends it, timed if anything subscribes"""
+
+        if not self.hooks:
+            return self._send(build(*args))
+
+        start = time.time()
+        request = build(*args)
+        encoded = time.time()
+        self.authorize(request)
+        authorized = time.time()
+        request.traces = []
+        response = error = None
+        try:
+            response = self._dispatch(request)
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.hooks.emit(self._request_event(request, response, error,
+                                                (start, encoded, authorized, time.time())))
+
+        return response
+
+    def _send(self, request):
+        self.authorize(request)
+
+        return self._dispatch(request)
+
+    def _dispatch(self, request):
+        if request.endpoint in IDEMPOTENT_ENDPOINTS and \
+           (self.retry is not None or self.hedge is not None):
+            return self._send_idempotent(request)
+
+        return self._send_once(request)
+
+    def _send_once(self, request, timeout=None):
+        if self.limiter is None:
+            return self._send_unlimited(request, timeout)
+
+        ticket = self.limiter.acquire()
+        try:
+            response = self._send_unlimited(request, timeout)
+        except Exception as error:
+            self.limiter.release(ticket, None, error)
+            raise
+
+        self.limiter.release(ticket, response)
+
+        return response
+
+    def _send_unlimited(self, request, timeout=None):
+        # Every send gets its own body: chunk sequences are re-iterable, streams are not
+        body = self._stream_body(request.chunks)
+        if request.traces is None:
+            return self._request(request.verb, request.sub_url, request.headers, body,
+                                 timeout)
+
+        with Trace() as trace:
+            request.traces.append(trace)
+            trace.start = time.time()
+            # Streamed, so that waiting for the headers and reading the body are told apart
+            response = self._request(request.verb, request.sub_url, request.headers, body,
+                                     timeout, stream=True)
+            trace.headers = time.time()
+            response.content
+            trace.end = time.time()
+            trace.response = response
+
+        return response
+
+    @staticmethod
+    def _request_event(request, response, error, times):
+        start, encoded, authorized, end = times
+        phases = {
+            'encode': encoded - start,
+            'auth': authorized - encoded,
+            'pool_wait': 0.0,
+            'connect': 0.0,
+            'send': 0.0,
+            'transfer': 0.0,
+            'total': end - start,
+        }
+
+        # The phases of the send which produced the response, else of the last one
+        traces = [trace for trace in request.traces if trace.response is response]
+        trace = (traces or request.traces or [None])[-1]
+        if trace is not None:
+            phases['pool_wait'] = trace.pool_wait
+            phases['connect'] = trace.connect
+            if trace.headers is not None:
+                phases['send'] = max(0.0, trace.headers - trace.start - trace.pool_wait
+                                     - trace.connect)
+                if trace.end is not None:
+                    phases['transfer'] = trace.end - trace.headers
+
+        sent = 0 if request.chunks is None else body_length(request.chunks)
+
+        return RequestEvent(request.endpoint, request.verb,
+                            None if response is None else response.status_code, error, phases,
+                            sent * len(request.traces),
+                            0 if response is None else len(response.content),
+                            len(request.traces), request.retries)
+
+    def _send_idempotent(self, request):
+        policy = self.retry or RetryPolicy(max_attempts=1)
+        start = time.time()
+        attempt = 0
+        while True:
+            timeout = None
+            if policy.deadline is not None:
+                remaining = policy.deadline - (time.time() - start)
+                timeout = remaining if self.timeout is None else min(self.timeout, remaining)
+
+            try:
+                if self.hedge is not None:
+                    response, error = self._send_hedged(request, timeout), None
+                else:
+                    response, error = self._send_once(request, timeout), None
+            except Exception as exc:
+                response, error = None, exc
+
+            attempt += 1
+            if attempt >= policy.max_attempts or not policy.retryable(response, error):
+                break
+
+            delay = policy.backoff(attempt, response)
+            if policy.deadline is not None and time.time() - start + delay >= policy.deadline:
+                break
+
+            time.sleep(delay)
+            request.retries += 1
+
+        if error is not None:
+            raise error
+
+        return response
+
+    def _hedge_pool(self):
+        pid = os.getpid()
+        with self._session_lock:
+            if self._hedge_executor is None or self._hedge_pid != pid:
+                # Two sends per pooled connection: every request may be hedged at once
+                self._hedge_executor = ThreadPoolExecutor(max_workers=2 * self.pool_maxsize)
+                self._hedge_pid = pid
+
+            return self._hedge_executor
+
+    def _send_hedged(self, request, timeout):
+        delay = self.hedge.delay(request.endpoint)
+        start = time.time()
+        if delay is None:
+            response = self._send_once(request, timeout)
+            self.hedge.observe(request.endpoint, time.time() - start)
+
+            return response
+
+        executor = self._hedge_pool()
+        primary = executor.submit(self._send_once, request, timeout)
+        done, _ = wait([primary], timeout=delay)
+        if not done:
+            hedge = executor.submit(self._send_once, request, timeout)
+            pending = [primary, hedge]
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                winner = next((future for future in done if future.exception() is None), None)
+                if winner is not None:
+                    self.hedge.record(winner is hedge)
+                    break
+
+                pending = [future for future in pending if future not in done]
+            else:
+                # Both copies failed; the slower one is discarded
+                self.hedge.record(False)
+                winner = primary
+        else:
+            winner = primary
+
+        response = winner.result()
+        self.hedge.observe(request.endpoint, time.time() - start)
+
+        return response
+
+    def get_asset_status(self, sha1):
+        return self._call(self._asset_status_request, sha1)
+
+    def get_asset_statuses(self, sha1s, concurrency=lookup.CONCURRENCY_DEFAULT):
+        """Looks up many assets at once and returns their responses keyed by SHA1
+
+        Lookups run concurrently. Concurrent lookups of the same SHA1, from this call or
+        any other thread, are merged into one request and successful responses are
+        reused for status_ttl seconds. A failed lookup has its exception in place of
+        its response."""
+
+        return self._asset_statuses.get_many(sha1s, concurrency=concurrency)
+
+    def get_render_status(self, render_id):
+        return self._call(self._render_status_request, render_id)
+
+    def patch_asset(self, asset_id, patch_index, data):
+        """Sends one patch of an asset
+
+        data may be bytes or any buffer-protocol object (e.g. a slice of an mmap), a
+        FileRegion or file object, or an iterable of chunks. The body is streamed: it is
+        hashed and sent chunk by chunk and never joined into one bytes object."""
+
+        return self._call(self._patch_asset_request, asset_id, patch_index, data)
+
+    def post_asset(self, data, sha1=None, patch_count=0):
+        """Creates an asset from its first (or only) patch
+
+        data accepts the same types as patch_asset(); a single-patch asset is streamed."""
+
+        return self._call(self._post_asset_request, data, sha1, patch_count)
+
+    def upload_file(self, filename, patch_size=PATCH_SIZE_DEFAULT,
+                    max_in_flight=MAX_IN_FLIGHT_DEFAULT, max_buffered_bytes=None,
+                    progress=None, sha1=None, index=None, journal=None, history=None):
+        """Uploads a file in patches sent concurrently and returns the new asset id
+
+        Raises UploadError if the service rejects any patch. Keep pool_maxsize at least
+        max_in_flight so that every worker gets a kept-alive connection.
+
+        If an AssetIndex is given the file is only hashed if its indexed hash is stale,
+        nothing is sent if the index already knows the asset id of that hash, and the new
+        asset id is recorded after uploading.
+
+        If an UploadJournal is given, an interrupted upload of the same file resumes
+        where it stopped, with the patch size it was started with.
+
+        With patch_size='auto' the patch size and the number of patches in flight (up to
+        max_in_flight) are chosen from a round trip probe and the bandwidth measured by
+        earlier uploads in the ThroughputHistory history, to fit max_buffered_bytes (by
+        default 64MB). Each upload then adds its measured goodput to history."""
+
+        if index is not None:
+            if sha1 is None:
+                sha1 = index.sha1(filename)
+
+            asset_id = index.asset_id(sha1)
+            if asset_id is not None:
+                return asset_id
+        elif sha1 is None:
+            sha1 = calc_sha1(filename)
+
+        if patch_size == tuning.AUTO:
+            if max_buffered_bytes is None:
+                max_buffered_bytes = tuning.MEMORY_BUDGET_DEFAULT
+
+            plan = tuning.plan_file_upload(self, filename, sha1, history=history,
+                                           memory_budget=max_buffered_bytes,
+                                           max_in_flight=max_in_flight, journal=journal)
+            patch_size = plan.patch_size
+            max_in_flight = plan.max_in_flight
+        elif journal is not None:
+            # An interrupted upload resumes with the patch size it was started with
+            patch_size = journal.patch_size(sha1) or patch_size
+
+        uploader = Uploader(self, patch_size=patch_size, max_in_flight=max_in_flight,
+                            max_buffered_bytes=max_buffered_bytes, progress=progress)
+        asset_id = uploader.upload(filename, sha1=sha1, journal=journal)
+        self._asset_statuses.invalidate(sha1)
+
+        if history is not None and uploader.goodput() is not None:
+            history.record(self.service_url, bandwidth=uploader.goodput())
+
+        if index is not None:
+            index.record_asset(sha1, asset_id)
+
+        return asset_id
+
+    def upload_stream(self, readable, patch_size=PATCH_SIZE_DEFAULT,
+                      max_in_flight=MAX_IN_FLIGHT_DEFAULT, max_buffered_bytes=None,
+                      progress=None, index=None, spool_memory=spool.MAX_MEMORY_DEFAULT,
+                      spool_directory=None):
+        """Uploads everything read from readable (e.g. a pipe) and returns the new asset id
+
+        The stream is read once, hashed as it is read and kept in a Spool: in memory up
+        to spool_memory bytes, past that in an unnamed temporary file in spool_directory.
+        The spooled copy is then uploaded as upload_file() uploads a file. If an
+        AssetIndex is given, nothing is uploaded when it knows the asset id of the hash."""
+
+        with spool.Spool(spool_memory, spool_directory) as spooled:
+            spooled.fill(readable)
+            sha1 = spooled.sha1()
+            if index is not None and index.asset_id(sha1) is not None:
+                return index.asset_id(sha1)
+
+            uploader = Uploader(self, patch_size=patch_size, max_in_flight=max_in_flight,
+                                max_buffered_bytes=max_buffered_bytes, progress=progress)
+            asset_id = uploader.upload_mapped(spooled.mapped(), sha1)
+
+        self._asset_statuses.invalidate(sha1)
+        if index is not None:
+            index.record_asset(sha1, asset_id)
+
+        return asset_id
+
+    def post_render(self, template_id, storage=None, vars_=None, wait_until=None, wait_secs=None):
+        """Submits a render of template_id
+
+        storage and vars_ may be given as bytes already encoded as JSON, e.g. by
+        client.codec.dumps(), to encode a value used by many renders only once."""
+
+        return self._call(self._post_render_request, template_id, storage, vars_, wait_until,
+                          wait_secs)
+
+    def ensure_render(self, template_id, storage=None, vars_=None):
+        """Returns the id of a render of template_id with the given storage and vars_
+
+        A render submitted by an identical earlier call within render_ttl seconds is
+        reused instead of rendering again, and identical concurrent calls submit one
+        render. Raises RenderError if the render is rejected."""
+
+        return self._renders.post(template_id, storage=storage, vars_=vars_)
+
+    def post_renders(self, template_id, vars_iterable, storage=None,
+                     concurrency=batch.CONCURRENCY_DEFAULT, ordered=False):
+        """Submits one render of template_id per vars_ dict and yields the results
+
+        vars_iterable is read lazily and up to concurrency renders are submitted at once,
+        so arbitrarily long streams run in flat memory. RenderResult objects are yielded
+        as renders complete, or in input order if ordered is True. A failed render is
+        reported in its result and does not stop the batch."""
+
+        return batch.post_renders(self, template_id, vars_iterable, storage=storage,
+                                  concurrency=concurrency, ordered=ordered)
+
+    def post_template(self, template):
+        """Creates a template; template may be given as bytes already encoded as JSON"""
+
+        return self._call(self._post_template_request, template)
+
+    def ensure_template(self, template):
+        """Returns the id of a template created from the given document
+
+        The template is only posted if no equal document (ignoring key order, whitespace
+        and number spelling) is in the client's template_store, by default held in memory.
+        Raises TemplateError if the template is rejected."""
+
+        return self._templates.ensure(template)
 
 class SignatureAuthClient(object):
-    """An authentication provider using the RSA signature method"""
+    """An authentication provider using the signature method
 
-    def __init__(self, api_key, private_key_filename):
+    The private key may be RSA (algorithm tag SHA256), Ed25519 (ED25519-SHA256) or a
+    NIST curve ECDSA key (ECDSA-SHA256); the type is detected from the key file. Elliptic
+    curve signatures cost far less CPU than RSA ones.
+
+    Signatures are computed on the calling thread unless signing_processes is given, in
+    which case they are spread across a ProcessPoolSigner of that many processes (0 for
+    one per core). pycryptodome is imported and the private key read and parsed by the
+    first signature, so creating a client costs nothing until it signs; parsed keys are
+    shared by every client of the same unchanged key file."""
+
+    def __init__(self, api_key, private_key_filename, signing_processes=None):
         self._api_key = api_key
-        self._private_key = RSA.importKey(open(private_key_filename, 'r').read())
+        self._private_key_filename = private_key_filename
+        self._signing_processes = signing_processes
+        self._signer = None
+        self._sha256 = None
+        self._lock = threading.Lock()
+
+    def close(self):
+        """Releases the resources of the signing backend"""
+
+        with self._lock:
+            if self._signer is not None:
+                self._signer.close()
+
+    def _load_signer(self):
+        with self._lock:
+            if self._signer is None:
+                from Crypto.Hash import SHA256
+                from verylargebits import signing
+
+                # Set first: other threads take a non-None _signer to mean ready
+                self._sha256 = SHA256
+                private_key = signing.load_private_key(self._private_key_filename)
+                if self._signing_processes is None:
+                    self._signer = signing.LocalSigner(private_key)
+                else:
+                    self._signer = signing.ProcessPoolSigner(private_key,
+                                                             self._signing_processes or None)
+
+            return self._signer
 
     def auth_value(self, verb, url, body=None):
         """Returns the Authorization header value for the given arguments"""
 
-        signer = PKCS1_v1_5.new(self._private_key)
-        digest = SHA256.new()
+        return self.auth_value_iter(verb, url, None if body is None else [body])
+
+    def auth_value_iter(self, verb, url, chunks=None):
+        """Returns the Authorization header value for a body given as chunks
+
+        chunks may be any iterable of buffers, such as a FileRegion; the digest is updated
+        one chunk at a time so the body never needs to be in memory at once."""
+
+        signer = self._signer or self._load_signer()
+        digest = self._sha256.new()
         digest.update(verb.encode('utf-8'))
         digest.update(url.encode('utf-8'))
 
-        if body != None:
-            digest.update(body)
+        if chunks != None:
+            for chunk in chunks:
+                digest.update(chunk)
 
         signature = signer.sign(digest)
         sig = base64.b64encode(signature)
 
-        return 'Signature ' + self._api_key + ':SHA256:' \
+        return 'Signature ' + self._api_key + ':' + signer.algorithm + ':' \
             + sig.decode('utf-8')
@@ -0,0 +1,81 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_TYPES = (bytes, bytearray, memoryview)
+
+class JsonCodec(object):
+    """Encodes and decodes JSON documents with the standard library"""
+
+    name = 'json'
+
+    def dumps(self, value):
+        """Returns value encoded as compact UTF-8 JSON bytes"""
+
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        """Returns the value of the given JSON bytes or text"""
+
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+
+        return json.loads(data)
+
+class OrjsonCodec(object):
+    """Encodes and decodes JSON documents with the orjson package"""
+
+    name = 'orjson'
+
+    def dumps(self, value):
+        """Returns value encoded as compact UTF-8 JSON bytes"""
+
+        # Non-string keys are allowed, as they are by the standard library
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data):
+        """Returns the value of the given JSON bytes or text"""
+
+        return orjson.loads(data)
+
+def default_codec():
+    """Returns the fastest codec available: orjson if it is installed"""
+
+    return OrjsonCodec() if orjson is not None else JsonCodec()
+
+def encoded(value, codec):
+    """Returns value encoded by codec, or value itself if it is already encoded JSON
+
+    Bytes-like values are taken to be JSON documents encoded by the caller, so a part of
+    a request body which never changes need only be encoded once."""
+
+    if isinstance(value, JSON_TYPES):
+        return value
+
+    return codec.dumps(value)
@@ -0,0 +1,65 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+def bounded_map(func, iterable, concurrency, ordered=False):
+    """Calls func on each item of iterable from a pool of concurrency threads
+
+    Yields (index, item, future) tuples as calls complete, or in input order if ordered
+    is True. The iterable is read lazily and at most concurrency calls, plus their
+    results waiting to be yielded, are outstanding at once, so memory stays flat however
+    long the input is. Closing the generator early cancels the calls not yet started."""
+
+    if concurrency < 1:
+        raise ValueError('concurrency must be positive')
+
+    items = enumerate(iterable)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending = deque()
+
+    def submit(count):
+        for index, item in islice(items, count):
+            pending.append((index, item, executor.submit(func, item)))
+
+    try:
+        submit(concurrency)
+        while pending:
+            if ordered:
+                index, item, future = pending.popleft()
+                wait([future])
+            else:
+                done, _ = wait([entry[2] for entry in pending], return_when=FIRST_COMPLETED)
+                entry = next(entry for entry in pending if entry[2] in done)
+                pending.remove(entry)
+                index, item, future = entry
+
+            submit(1)
+            yield index, item, future
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+        executor.shutdown(wait=True)
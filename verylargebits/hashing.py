@@ -0,0 +1,99 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import hashlib
+import io
+import os
+
+# Read size used when hashing files: large enough that hashlib releases the GIL and
+# per-read overhead disappears, small enough to stay in cache between the read and the
+# hash, and a multiple of the page size so reads stay aligned
+READ_SIZE_DEFAULT = 1024 * 1024
+
+def encode_sha1(sha1):
+    """Returns the urlsafe base64 encoding of a hashlib SHA1 digest"""
+
+    return base64.urlsafe_b64encode(sha1.digest()).decode('utf-8')
+
+def calc_sha1(filename, read_size=READ_SIZE_DEFAULT):
+    """Calculates and returns the base64 encoded SHA1 hash of a file
+
+    The file is read unbuffered into one reused buffer, after telling the kernel it
+    will be read sequentially so that readahead stays ahead of the hash."""
+
+    sha1 = hashlib.sha1()
+    buffer_ = bytearray(read_size)
+    view = memoryview(buffer_)
+
+    with io.open(filename, 'rb', buffering=0) as file_:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(file_.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        while True:
+            count = file_.readinto(buffer_)
+            if not count:
+                break
+
+            sha1.update(view[:count])
+
+    return encode_sha1(sha1)
+
+def hash_workers_default():
+    """Returns the default number of files hashed at once: one per core"""
+
+    import multiprocessing
+
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 4
+
+def calc_sha1s(filenames, max_workers=None, processes=False, read_size=READ_SIZE_DEFAULT):
+    """Returns the calc_sha1 hashes of many files, in order
+
+    Files are hashed max_workers at a time (by default one per core) on threads, which
+    run in parallel since hashlib releases the GIL while hashing each large read. With
+    processes the files are hashed by a process pool instead, for interpreters where
+    hashing holds the GIL."""
+
+    filenames = list(filenames)
+    if max_workers is None:
+        max_workers = hash_workers_default()
+
+    max_workers = max(1, min(max_workers, len(filenames)))
+    if max_workers == 1:
+        return [calc_sha1(filename, read_size) for filename in filenames]
+
+    if processes:
+        # multiprocessing is imported by the first process pool, not by this module
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    with executor:
+        return list(executor.map(partial(calc_sha1, read_size=read_size), filenames))
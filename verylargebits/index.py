@@ -0,0 +1,174 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import os
+import sqlite3
+import threading
+import time
+
+from verylargebits.hashing import calc_sha1
+
+# Files modified this close to when they were hashed may have changed again within the
+# same mtime tick, so their entries are not trusted (the "racy git" problem)
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    device INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    hashed_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_sha1 ON files (sha1);
+CREATE TABLE IF NOT EXISTS assets (
+    sha1 TEXT PRIMARY KEY,
+    asset_id TEXT NOT NULL
+);
+'''
+
+def _stat_key(stat):
+    mtime_ns = getattr(stat, 'st_mtime_ns', None)
+    if mtime_ns is None:
+        mtime_ns = int(stat.st_mtime * 1000 * 1000 * 1000)
+
+    return stat.st_size, mtime_ns, stat.st_ino, stat.st_dev
+
+class AssetIndex(object):
+    """A persistent SQLite index of file hashes and known asset ids
+
+    A file's SHA1 is keyed by its absolute path and trusted only while the file's size,
+    mtime, inode and device are unchanged, and only if it was hashed comfortably after
+    its last modification. Asset ids are keyed by SHA1, so a copy of an uploaded file is
+    known to exist without asking the service. The index may be shared by several
+    threads; concurrent processes are serialized by SQLite."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def lookup(self, path):
+        """Returns the indexed SHA1 of the given file, or None if unknown or stale"""
+
+        path = os.path.abspath(path)
+        key = _stat_key(os.stat(path))
+        with self._lock:
+            row = self._db.execute(
+                'SELECT size, mtime_ns, inode, device, sha1, hashed_ns FROM files'
+                ' WHERE path = ?', (path,)).fetchone()
+
+        if row is None or tuple(row[:4]) != key or row[5] - key[1] < RACY_WINDOW_NS:
+            return None
+
+        return row[4]
+
+    def sha1(self, path):
+        """Returns the SHA1 of the given file, hashing and indexing it only if needed"""
+
+        sha1 = self.lookup(path)
+        if sha1 is None:
+            stat = os.stat(path)
+            sha1 = calc_sha1(path)
+            self.record(path, sha1, stat)
+
+        return sha1
+
+    def record(self, path, sha1, stat=None):
+        """Indexes the SHA1 of the given file; stat must be taken before hashing"""
+
+        path = os.path.abspath(path)
+        size, mtime_ns, inode, device = _stat_key(stat or os.stat(path))
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             (path, size, mtime_ns, inode, device, sha1,
+                              int(time.time() * 1000 * 1000 * 1000)))
+
+    def asset_id(self, sha1):
+        """Returns the known asset id of the given SHA1, or None"""
+
+        with self._lock:
+            row = self._db.execute('SELECT asset_id FROM assets WHERE sha1 = ?',
+                                   (sha1,)).fetchone()
+
+        return None if row is None else row[0]
+
+    def record_asset(self, sha1, asset_id):
+        """Remembers that the given SHA1 exists as the given asset"""
+
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO assets VALUES (?, ?)', (sha1, asset_id))
+
+    def invalidate(self, path):
+        """Forgets the SHA1 of the given file"""
+
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM files WHERE path = ?', (os.path.abspath(path),))
+
+    def forget_asset(self, sha1):
+        """Forgets the asset id of the given SHA1, e.g. after the service lost it"""
+
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM assets WHERE sha1 = ?', (sha1,))
+
+    def compact(self):
+        """Drops stale entries and reclaims their space; returns the number dropped
+
+        Entries for files which are gone or have changed are removed, as are asset ids no
+        longer referenced by any indexed file."""
+
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT path, size, mtime_ns, inode, device FROM files').fetchall()
+
+        stale = []
+        for row in rows:
+            try:
+                if _stat_key(os.stat(row[0])) != tuple(row[1:]):
+                    stale.append((row[0],))
+            except OSError:
+                stale.append((row[0],))
+
+        with self._lock:
+            with self._db:
+                self._db.executemany('DELETE FROM files WHERE path = ?', stale)
+                orphans = self._db.execute(
+                    'DELETE FROM assets WHERE sha1 NOT IN (SELECT sha1 FROM files)').rowcount
+
+            self._db.execute('VACUUM')
+
+        return len(stale) + orphans
@@ -0,0 +1,277 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock() a journal directory must not be shared by several processes
+    fcntl = None
+
+# Asset status after which an upload record is no longer needed
+USABLE = 'USABLE'
+
+def _lock(filename, blocking=True):
+    """Opens and exclusively locks filename; returns the open file or None if busy
+
+    The lock file may be removed by its holder, so after locking we check that the path
+    still names the file we locked and start over if it does not."""
+
+    while True:
+        lock_file = open(filename, 'a')
+        if fcntl is None:
+            return lock_file
+
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except (IOError, OSError):
+            lock_file.close()
+            return None
+
+        try:
+            if os.stat(filename).st_ino == os.fstat(lock_file.fileno()).st_ino:
+                return lock_file
+        except OSError:
+            pass
+
+        lock_file.close()
+
+class JournalEntry(object):
+    """The durable record of one upload, held under an exclusive lock
+
+    Records the asset id once patch 0 is accepted and the index of every acknowledged
+    patch. Every record is flushed and fsync()ed before it is relied on, and a torn
+    final line left by a crash is ignored when the entry is read back. Opening a record
+    with another patch size than it was started with raises ValueError.
+
+    waited is True if another process held the record when it was opened; that process
+    may have finished the upload and removed the record since."""
+
+    def __init__(self, journal, sha1, patch_size, patch_count):
+        self.journal = journal
+        self.sha1 = sha1
+        self.patch_size = patch_size
+        self.patch_count = patch_count
+        self.asset_id = None
+        self.acked = set()
+        self._lock = threading.Lock()
+        self._lock_file = _lock(journal.path(sha1, '.lock'), blocking=False)
+        self.waited = self._lock_file is None
+        if self.waited:
+            self._lock_file = _lock(journal.path(sha1, '.lock'))
+
+        self._load()
+        self._log = open(journal.path(sha1, '.journal'), 'a')
+        if self._log.tell() == 0:
+            self._append({
+                'sha1': sha1,
+                'patch_size': patch_size,
+                'patch_count': patch_count,
+            })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def complete(self):
+        """True once every patch has been acknowledged"""
+
+        return self.asset_id is not None and len(self.acked) == self.patch_count
+
+    def missing(self):
+        """Returns the indexes of the patches not yet acknowledged, in order"""
+
+        return [index for index in range(self.patch_count) if index not in self.acked]
+
+    def record_asset(self, asset_id):
+        """Records the asset created by patch 0"""
+
+        with self._lock:
+            self._append({'asset_id': asset_id})
+            self.asset_id = asset_id
+            self.acked.add(0)
+
+    def ack(self, patch_index):
+        """Records that the given patch was accepted by the service"""
+
+        with self._lock:
+            self._append({'patch': patch_index})
+            self.acked.add(patch_index)
+
+    def remove(self):
+        """Deletes the record; the entry must not be used afterwards"""
+
+        self._log.close()
+        self.journal.remove_files(self.sha1)
+        self.close()
+
+    def close(self):
+        """Releases the lock so other processes may use the record"""
+
+        if not self._log.closed:
+            self._log.close()
+
+        if not self._lock_file.closed:
+            # Closing the file releases the flock()
+            self._lock_file.close()
+
+    def _load(self):
+        filename = self.journal.path(self.sha1, '.journal')
+        try:
+            with open(filename) as log:
+                lines = log.read().split('\n')
+        except (IOError, OSError):
+            return
+
+        records = []
+        for line in lines[:-1]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                break
+
+        header = records[0] if records else {}
+        if header.get('sha1') != self.sha1:
+            # Torn before the header was complete: start again
+            os.remove(filename)
+            return
+
+        if header.get('patch_size') != self.patch_size \
+                or header.get('patch_count') != self.patch_count:
+            # The asset already exists part-uploaded: its patches cannot be renumbered
+            self._lock_file.close()
+            raise ValueError('The upload of %s was started with %s byte patches'
+                             % (self.sha1, header.get('patch_size')))
+
+        for record in records[1:]:
+            if 'asset_id' in record:
+                self.asset_id = record['asset_id']
+                self.acked.add(0)
+            elif 'patch' in record:
+                self.acked.add(record['patch'])
+
+        if lines[-1]:
+            # Drop the torn final record so appends start on a fresh line
+            with open(filename, 'r+') as log:
+                log.truncate(len('\n'.join(lines[:-1])) + 1)
+
+    def _append(self, record):
+        self._log.write(json.dumps(record) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+
+class UploadJournal(object):
+    """A directory of upload records which lets interrupted uploads resume
+
+    Each asset, keyed by its SHA1, has an append-only record of its asset id, patch size
+    and acknowledged patches. Opening a record takes an exclusive flock(), so processes
+    sharing the directory never upload the same asset at once: a second process waits,
+    then resumes the record or, if the first one finished and removed it, asks the
+    service for the asset rather than sending it again. A record is removed when the
+    service reports the asset USABLE at the end of its upload; as the service is often
+    still processing then, prune() removes the records of assets that became USABLE
+    later."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, sha1, suffix):
+        """Returns the filename of one of the files of the given asset"""
+
+        return os.path.join(self.directory, sha1 + suffix)
+
+    def open(self, sha1, patch_size, patch_count):
+        """Returns the locked JournalEntry of the given upload, blocking while another
+        process holds it"""
+
+        return JournalEntry(self, sha1, patch_size, patch_count)
+
+    def remove_files(self, sha1):
+        """Deletes the files of the given upload; the caller must hold its lock"""
+
+        for suffix in ('.journal', '.lock'):
+            try:
+                os.remove(self.path(sha1, suffix))
+            except OSError:
+                pass
+
+    def patch_size(self, sha1):
+        """Returns the patch size of the recorded upload of the given asset, or None"""
+
+        try:
+            with open(self.path(sha1, '.journal')) as log:
+                return json.loads(log.readline()).get('patch_size')
+        except (IOError, OSError, ValueError):
+            return None
+
+    def sha1s(self):
+        """Returns the SHA1 of every recorded upload"""
+
+        return [name[:-len('.journal')] for name in os.listdir(self.directory)
+                if name.endswith('.journal')]
+
+    def prune(self, client):
+        """Removes the records of uploads whose assets are now USABLE; returns their SHA1s"""
+
+        removed = []
+        for sha1 in self.sha1s():
+            # Uploads in progress in other processes are left alone
+            lock_file = _lock(self.path(sha1, '.lock'), blocking=False)
+            if lock_file is None:
+                continue
+
+            try:
+                if not os.path.exists(self.path(sha1, '.journal')):
+                    # Finished by another process since we listed the directory
+                    self.remove_files(sha1)
+                elif is_usable(client, sha1):
+                    self.remove_files(sha1)
+                    removed.append(sha1)
+            finally:
+                lock_file.close()
+
+        return removed
+
+def is_usable(client, sha1):
+    """Returns True if the service reports the given asset as USABLE"""
+
+    return usable_asset_id(client, sha1) is not None
+
+def usable_asset_id(client, sha1):
+    """Returns the id of the given asset if the service reports it USABLE, else None"""
+
+    resp = client.get_asset_status(sha1)
+    if resp.status_code != 200:
+        return None
+
+    value = resp.json()
+
+    return value.get('id') if value.get('status') == USABLE else None
@@ -0,0 +1,85 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from verylargebits.cache import SingleFlight, TTLCache
+from verylargebits.concurrency import bounded_map
+
+# Lookup defaults
+CONCURRENCY_DEFAULT = 8
+STATUS_TTL_DEFAULT = 5.0
+
+class AssetStatusLookup(object):
+    """Looks up asset statuses, merging duplicate lookups of the same SHA1
+
+    A lookup already in flight for a SHA1 is shared by every caller asking for it, and
+    successful responses are remembered for ttl seconds, so any number of threads
+    checking the same hash cause one request."""
+
+    def __init__(self, client, ttl=STATUS_TTL_DEFAULT, max_entries=10000):
+        self.client = client
+        self._cache = TTLCache(ttl, max_entries)
+        self._flights = SingleFlight()
+
+    def get(self, sha1):
+        """Returns the get_asset_status response for the given SHA1"""
+
+        response = self._cache.get(sha1)
+        if response is None:
+            response = self._flights.do(sha1, lambda: self._fetch(sha1))
+
+        return response
+
+    def get_many(self, sha1s, concurrency=CONCURRENCY_DEFAULT):
+        """Returns a dict of get_asset_status responses keyed by SHA1
+
+        Lookups run on up to concurrency threads; each distinct SHA1 is looked up once.
+        A lookup which raises has the exception in place of its response, so one failure
+        does not lose the other results."""
+
+        responses = {}
+        for _, sha1, future in bounded_map(self.get, _unique(sha1s), concurrency):
+            try:
+                responses[sha1] = future.result()
+            except Exception as error:
+                responses[sha1] = error
+
+        return responses
+
+    def invalidate(self, sha1):
+        """Forgets the cached status of the given SHA1, e.g. after uploading it"""
+
+        self._cache.pop(sha1)
+
+    def _fetch(self, sha1):
+        response = self.client.get_asset_status(sha1)
+        if response.status_code == 200:
+            self._cache.set(sha1, response)
+
+        return response
+
+def _unique(items):
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
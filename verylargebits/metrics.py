@@ -0,0 +1,272 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from bisect import bisect_left
+import socket
+import threading
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS_DEFAULT = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0, 30.0, 60.0)
+
+# The timed phases of a request, in order
+PHASES = ('encode', 'auth', 'pool_wait', 'connect', 'send', 'transfer', 'total')
+
+STATSD_ADDRESS_DEFAULT = ('127.0.0.1', 8125)
+PREFIX_DEFAULT = 'verylargebits'
+
+_local = threading.local()
+
+def current_trace():
+    """Returns the Trace of the request being sent by this thread, or None"""
+
+    return getattr(_local, 'trace', None)
+
+class Trace(object):
+    """Timings of one send of a request, filled in as it progresses
+
+    pool_wait and connect are added to by the transport while trace is current."""
+
+    def __init__(self):
+        self.pool_wait = 0.0
+        self.connect = 0.0
+        self.start = None
+        self.headers = None
+        self.end = None
+        self.response = None
+
+    def __enter__(self):
+        _local.trace = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.trace = None
+
+class RequestEvent(object):
+    """What happened to one client request, as reported to Hooks subscribers
+
+    phases maps each of PHASES to seconds: encode is building the request body, auth
+    computing the Authorization header, pool_wait waiting for a free pooled connection,
+    connect opening a new one, send writing the request and waiting for the response
+    headers (time to first byte), transfer reading the response body and total all of
+    it, including retry waits. Phases after auth are those of the send which produced
+    the response. sends counts every send, including retries and hedges."""
+
+    def __init__(self, endpoint, verb, status_code, error, phases, bytes_sent,
+                 bytes_received, sends, retries):
+        self.endpoint = endpoint
+        self.verb = verb
+        self.status_code = status_code
+        self.error = error
+        self.phases = phases
+        self.bytes_sent = bytes_sent
+        self.bytes_received = bytes_received
+        self.sends = sends
+        self.retries = retries
+
+    def __repr__(self):
+        return '<RequestEvent %s [%s] %.1fms>' % (self.endpoint, self.status_code,
+                                                 self.phases['total'] * 1000)
+
+class Hooks(object):
+    """Subscribers called with a RequestEvent as each request completes
+
+    A client only times its requests while something is subscribed; an empty Hooks is
+    false, so the untimed path costs one truth test. Subscribers are called on the
+    thread which sent the request and must be thread-safe; exceptions they raise are
+    ignored so that instrumentation cannot fail a request."""
+
+    def __init__(self):
+        self._subscribers = ()
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._subscribers)
+
+    __nonzero__ = __bool__
+
+    def subscribe(self, callback):
+        """Calls callback(event) for every completed request; returns callback"""
+
+        with self._lock:
+            self._subscribers = self._subscribers + (callback,)
+
+        return callback
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = tuple(subscriber for subscriber in self._subscribers
+                                      if subscriber != callback)
+
+    def emit(self, event):
+        for subscriber in self._subscribers:
+            try:
+                subscriber(event)
+            except Exception:
+                pass
+
+class Histogram(object):
+    """Counts of observations falling under each of a fixed set of bucket bounds"""
+
+    def __init__(self, buckets=BUCKETS_DEFAULT):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Returns the upper bound of the bucket holding the q quantile, or None"""
+
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+
+        return float('inf')
+
+class HistogramAggregator(object):
+    """Aggregates RequestEvents into per-endpoint phase histograms and counters
+
+    Subscribe an instance to Client.hooks; prometheus_text() renders everything seen so
+    far in the Prometheus text exposition format."""
+
+    def __init__(self, buckets=BUCKETS_DEFAULT, prefix=PREFIX_DEFAULT):
+        self.buckets = buckets
+        self.prefix = prefix
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            for phase, seconds in event.phases.items():
+                histogram = self._histograms.get((event.endpoint, phase))
+                if histogram is None:
+                    histogram = self._histograms[(event.endpoint, phase)] = \
+                        Histogram(self.buckets)
+
+                histogram.observe(seconds)
+
+            status = 'error' if event.status_code is None else str(event.status_code)
+            self._add(('requests_total', event.endpoint, status), 1)
+            self._add(('bytes_sent_total', event.endpoint, None), event.bytes_sent)
+            self._add(('bytes_received_total', event.endpoint, None), event.bytes_received)
+            self._add(('retries_total', event.endpoint, None), event.retries)
+            self._add(('hedges_total', event.endpoint, None),
+                      event.sends - event.retries - 1)
+
+    def _add(self, key, value):
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, endpoint, phase):
+        """Returns the Histogram of the given phase of endpoint, or None"""
+
+        with self._lock:
+            return self._histograms.get((endpoint, phase))
+
+    def counter(self, name, endpoint, status=None):
+        """Returns the value of a counter such as 'requests_total' or 'retries_total'"""
+
+        with self._lock:
+            if status is None and name == 'requests_total':
+                return sum(value for key, value in self._counters.items()
+                           if key[:2] == (name, endpoint))
+
+            return self._counters.get((name, endpoint, status), 0)
+
+    def prometheus_text(self):
+        """Returns every metric in the Prometheus text exposition format"""
+
+        name = self.prefix + '_request_phase_seconds'
+        lines = ['# TYPE %s histogram' % name]
+        with self._lock:
+            for (endpoint, phase), histogram in sorted(self._histograms.items()):
+                labels = 'endpoint="%s",phase="%s"' % (endpoint, phase)
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), histogram.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, le, cumulative))
+
+                lines.append('%s_sum{%s} %r' % (name, labels, histogram.sum))
+                lines.append('%s_count{%s} %d' % (name, labels, histogram.count))
+
+            counters = sorted(self._counters.items(), key=lambda item: tuple(
+                '' if part is None else part for part in item[0]))
+
+        typed = set()
+        for (counter, endpoint, status), value in counters:
+            name = '%s_%s' % (self.prefix, counter)
+            if name not in typed:
+                lines.append('# TYPE %s counter' % name)
+                typed.add(name)
+
+            labels = 'endpoint="%s"' % endpoint
+            if status is not None:
+                labels += ',status="%s"' % status
+
+            lines.append('%s{%s} %d' % (name, labels, value))
+
+        return '\n'.join(lines) + '\n'
+
+class StatsdExporter(object):
+    """Sends each RequestEvent to a StatsD daemon as one UDP datagram
+
+    Phases are sent as timers named <prefix>.<endpoint>.<phase> and bytes, retries and
+    responses by status as counters. Sending never blocks and lost datagrams are not
+    retried. Subscribe an instance to Client.hooks."""
+
+    def __init__(self, address=STATSD_ADDRESS_DEFAULT, prefix=PREFIX_DEFAULT):
+        self.address = address
+        self.prefix = prefix
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def close(self):
+        self._socket.close()
+
+    def __call__(self, event):
+        name = '%s.%s' % (self.prefix, event.endpoint)
+        status = 'error' if event.status_code is None else str(event.status_code)
+        lines = ['%s.%s:%.3f|ms' % (name, phase, seconds * 1000)
+                 for phase, seconds in sorted(event.phases.items())]
+        lines.append('%s.status.%s:1|c' % (name, status))
+        lines.append('%s.bytes_sent:%d|c' % (name, event.bytes_sent))
+        lines.append('%s.bytes_received:%d|c' % (name, event.bytes_received))
+        if event.retries:
+            lines.append('%s.retries:%d|c' % (name, event.retries))
+
+        try:
+            self._socket.sendto('\n'.join(lines).encode('utf-8'), self.address)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,279 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from contextlib import contextmanager
+import errno
+import json
+import os
+import threading
+import time
+
+from verylargebits.retry import retry_after
+
+try:
+    import fcntl
+except ImportError:
+    # Without flock() a state file must not be shared by several processes
+    fcntl = None
+
+# Statuses telling us the service is overloaded: the concurrency limit is cut
+OVERLOAD_STATUSES = frozenset([429, 503])
+
+# Concurrency limit defaults
+LIMIT_DEFAULT = 8
+MIN_LIMIT_DEFAULT = 1
+MAX_LIMIT_DEFAULT = 64
+DECREASE_DEFAULT = 0.5
+
+# Seconds between checks for slots freed by other processes
+POLL_INTERVAL = 0.01
+
+class _SharedState(object):
+    """A JSON-compatible dict shared by the threads of a process, and by every process on
+    the host when filename is given
+
+    The file is locked with flock() and read and written back on every update, so it
+    holds the one copy of the state. Locks belong to an open file, so each process opens
+    its own after a fork()."""
+
+    def __init__(self, initial, filename=None):
+        if filename is not None and fcntl is None:
+            raise ValueError('Sharing a rate limit between processes needs flock()')
+
+        self.filename = filename
+        self._initial = initial
+        self._state = json.loads(json.dumps(initial))
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_pid = None
+
+    @contextmanager
+    def update(self):
+        """Yields the state locked for this thread and process, saving it afterwards"""
+
+        with self._lock:
+            if self.filename is None:
+                yield self._state
+                return
+
+            file_ = self._open()
+            fcntl.flock(file_.fileno(), fcntl.LOCK_EX)
+            try:
+                file_.seek(0)
+                try:
+                    state = json.loads(file_.read() or 'null')
+                except ValueError:
+                    state = None
+
+                if not isinstance(state, dict):
+                    state = json.loads(json.dumps(self._initial))
+
+                yield state
+                file_.seek(0)
+                file_.truncate()
+                file_.write(json.dumps(state))
+                file_.flush()
+            finally:
+                fcntl.flock(file_.fileno(), fcntl.LOCK_UN)
+
+    def shared(self):
+        """Returns True if other processes may change the state"""
+
+        return self.filename is not None
+
+    def close(self):
+        with self._lock:
+            if self._file is not None and self._file_pid == os.getpid():
+                self._file.close()
+
+            self._file = None
+            self._file_pid = None
+
+    def _open(self):
+        pid = os.getpid()
+        if self._file is None or self._file_pid != pid:
+            # A file inherited over fork() shares its lock with the parent: never use it
+            self._file = open(self.filename, 'a+')
+            self._file_pid = pid
+
+        return self._file
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError as error:
+        return error.errno == errno.EPERM
+
+    return True
+
+class RateLimiter(object):
+    """Paces the requests of every Client sharing it to what the service can take
+
+    Two limits apply to each request sent:
+
+    - A token bucket of rate requests per second with bursts of up to burst requests,
+      if rate is given. Tokens are reserved in turn, so waiting requests are released
+      one every 1/rate seconds rather than all at once.
+    - An AIMD concurrency limit: at most limit requests are in flight. Every successful
+      response adds 1/limit to it (so one per limit's worth of responses) up to
+      max_limit, and an OVERLOAD_STATUSES response multiplies it by decrease down to
+      min_limit. Only the first overload of the requests sent under a limit cuts it, so
+      a burst of 429s answering one window of requests halves it once, not per 429.
+
+    A Retry-After on an overload response pauses every request until it has passed,
+    then the bucket is emptied so the requests which waited resume at rate.
+
+    The state lives in memory, shared by the threads using this limiter. With
+    state_file every process on the host using the same file shares one limit; slots
+    held by a process which died are given back. stats() reports the current limit,
+    the requests in flight and the overload responses seen."""
+
+    def __init__(self, rate=None, burst=None, limit=LIMIT_DEFAULT, min_limit=MIN_LIMIT_DEFAULT,
+                 max_limit=MAX_LIMIT_DEFAULT, decrease=DECREASE_DEFAULT, state_file=None):
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive')
+
+        if min_limit < 1:
+            raise ValueError('min_limit must be positive')
+
+        if not min_limit <= limit <= max_limit:
+            raise ValueError('limit must be between min_limit and max_limit')
+
+        self.rate = rate
+        self.burst = max(1.0, float(burst if burst is not None else rate or 1))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self._state = _SharedState({
+            'limit': float(limit),
+            'generation': 0,
+            'in_flight': {},
+            'tokens': self.burst,
+            'updated': 0.0,
+            'paused_until': 0.0,
+            'requests': 0,
+            'overloads': 0,
+        }, state_file)
+        self._released = threading.Condition(threading.Lock())
+
+    def acquire(self):
+        """Waits for a slot and a token; returns the ticket to pass to release()"""
+
+        while True:
+            # Holding the condition while looking means no release goes unnoticed
+            with self._released:
+                with self._state.update() as state:
+                    wait, ticket = self._take(state, time.time())
+
+                if ticket is None:
+                    # Woken by a release in this process; other processes are polled
+                    self._released.wait(wait if wait is not None else self._poll_interval())
+                    continue
+
+            if wait > 0:
+                time.sleep(wait)
+
+            return ticket
+
+    def release(self, ticket, response=None, error=None):
+        """Gives back the slot of a sent request and adapts to its outcome"""
+
+        now = time.time()
+        with self._state.update() as state:
+            pid = str(os.getpid())
+            count = state['in_flight'].get(pid, 0) - 1
+            if count > 0:
+                state['in_flight'][pid] = count
+            else:
+                state['in_flight'].pop(pid, None)
+
+            state['requests'] += 1
+            if response is not None and response.status_code in OVERLOAD_STATUSES:
+                state['overloads'] += 1
+                if ticket == state['generation']:
+                    state['limit'] = max(self.min_limit, state['limit'] * self.decrease)
+                    state['generation'] += 1
+
+                pause = retry_after(response)
+                if pause:
+                    state['paused_until'] = max(state['paused_until'], now + pause)
+                    state['tokens'] = min(state['tokens'], 0.0)
+                    state['updated'] = max(state['updated'], state['paused_until'])
+            elif response is not None:
+                state['limit'] = min(self.max_limit, state['limit'] + 1.0 / state['limit'])
+
+        with self._released:
+            self._released.notify_all()
+
+    def stats(self):
+        """Returns the current limit, requests in flight and requests and overloads seen"""
+
+        with self._state.update() as state:
+            return {
+                'limit': state['limit'],
+                'in_flight': sum(state['in_flight'].values()),
+                'requests': state['requests'],
+                'overloads': state['overloads'],
+            }
+
+    def close(self):
+        self._state.close()
+
+    def _poll_interval(self):
+        return POLL_INTERVAL if self._state.shared() else None
+
+    def _take(self, state, now):
+        """Takes a slot and reserves a token if possible
+
+        Returns (seconds to wait, ticket): with a ticket, the wait for its token; without
+        one, how long to wait before trying again (None for until a release)."""
+
+        if now < state['paused_until']:
+            return state['paused_until'] - now, None
+
+        in_flight = state['in_flight']
+        if self._state.shared():
+            # Slots of processes which exited without releasing them are free again
+            for pid in list(in_flight):
+                if int(pid) != os.getpid() and not _alive(int(pid)):
+                    del in_flight[pid]
+
+        if sum(in_flight.values()) >= int(state['limit']):
+            return None, None
+
+        pid = str(os.getpid())
+        in_flight[pid] = in_flight.get(pid, 0) + 1
+
+        wait = 0.0
+        if self.rate is not None:
+            if now > state['updated']:
+                state['tokens'] = min(self.burst,
+                                      state['tokens'] + (now - state['updated']) * self.rate)
+                state['updated'] = now
+
+            # Reserving a token ahead of time spaces the waiting requests 1/rate apart
+            state['tokens'] -= 1.0
+            if state['tokens'] < 0:
+                wait = -state['tokens'] / self.rate + max(0.0, state['updated'] - now)
+
+        return wait, state['generation']
@@ -0,0 +1,90 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import hashlib
+
+from verylargebits.cache import SingleFlight, TTLCache
+from verylargebits.templates import canonical_json
+
+# Render de-duplication defaults
+RENDER_TTL_DEFAULT = 300.0
+MAX_ENTRIES_DEFAULT = 10000
+
+class RenderError(Exception):
+    """Raised when the service rejects a render"""
+
+    def __init__(self, message, response=None):
+        super(RenderError, self).__init__(message)
+        self.response = response
+
+def render_key(template_id, storage=None, vars_=None):
+    """Returns the hex SHA256 identifying a (template_id, storage, vars_) render
+
+    storage and vars_ are canonicalized as templates are, and may be given as bytes
+    already encoded as JSON."""
+
+    # template_id is hashed as text: on Python 2 it is a str, which would read as JSON
+    digest = hashlib.sha256(template_id.encode('utf-8') + b'\n')
+    for part in (storage, vars_):
+        digest.update(canonical_json(part))
+        digest.update(b'\n')
+
+    return digest.hexdigest()
+
+class RenderDeduplicator(object):
+    """Submits renders, reusing the render of an identical earlier submission
+
+    Renders are keyed by render_key(). The id of an accepted render is reused for ttl
+    seconds, or until max_entries more recently used renders push it out, and identical
+    submissions in flight at the same time are merged into one request."""
+
+    def __init__(self, client, ttl=RENDER_TTL_DEFAULT, max_entries=MAX_ENTRIES_DEFAULT):
+        self.client = client
+        self._cache = TTLCache(ttl, max_entries)
+        self._flights = SingleFlight()
+
+    def post(self, template_id, storage=None, vars_=None):
+        """Returns the id of a render of template_id with the given storage and vars_"""
+
+        key = render_key(template_id, storage, vars_)
+        render_id = self._cache.get(key)
+        if render_id is None:
+            render_id = self._flights.do(
+                key, lambda: self._post(key, template_id, storage, vars_))
+
+        return render_id
+
+    def invalidate(self, template_id, storage=None, vars_=None):
+        """Forgets the render of the given submission, so the next one renders again"""
+
+        self._cache.pop(render_key(template_id, storage, vars_))
+
+    def _post(self, key, template_id, storage, vars_):
+        resp = self.client.post_render(template_id, storage=storage, vars_=vars_)
+        if resp.status_code != 200:
+            raise RenderError('HTTP Error: %s' % resp, resp)
+
+        render_id = self.client.json(resp)['id']
+        self._cache.set(key, render_id)
+
+        return render_id
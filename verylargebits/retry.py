@@ -0,0 +1,136 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from collections import deque
+import random
+import threading
+
+# Endpoints which may safely be sent more than once
+IDEMPOTENT_ENDPOINTS = frozenset(['get_asset_status', 'get_render_status', 'patch_asset'])
+
+# Statuses worth retrying: rate limiting and transient server failures
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+def retry_after(response):
+    """Returns the seconds asked for by a Retry-After header in seconds form, or None"""
+
+    if response is None:
+        return None
+
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy(object):
+    """When and how long to wait before sending an idempotent request again
+
+    A request is retried after connection errors, timeouts and RETRY_STATUSES responses,
+    up to max_attempts sends in all. The wait before attempt n is drawn uniformly from
+    [0, min(max_delay, base_delay * 2^n)] ("full jitter") so that clients which failed
+    together do not retry together, unless the response asked for a longer Retry-After.
+    deadline, if given, bounds the total seconds spent on a request, including waits;
+    each attempt's timeout is cut to the time left."""
+
+    def __init__(self, max_attempts=3, base_delay=0.25, max_delay=10.0, deadline=None,
+                 retry_statuses=RETRY_STATUSES):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.retry_statuses = frozenset(retry_statuses)
+
+    def retryable(self, response=None, error=None):
+        """Returns True if the outcome of an attempt is worth retrying"""
+
+        if error is not None:
+            # requests' exceptions are IOErrors; anything else is a bug, not bad luck
+            return isinstance(error, (IOError, OSError))
+
+        return response.status_code in self.retry_statuses
+
+    def backoff(self, attempt, response=None):
+        """Returns the seconds to wait after the given (1-based) failed attempt"""
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after(response)
+        if requested is not None:
+            delay = max(delay, requested)
+
+        return delay
+
+class HedgePolicy(object):
+    """When to send a second copy of a slow idempotent request
+
+    The latencies of the last window requests of each endpoint are kept. Once
+    min_samples are known, a request still unanswered after the given percentile of
+    them is sent again and whichever copy answers first is used. stats() reports how
+    often that happens and how often the second copy wins."""
+
+    def __init__(self, percentile=95.0, min_samples=20, window=200):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window = window
+        self._latencies = {}
+        self._counts = {'requests': 0, 'hedged': 0, 'hedge_wins': 0}
+        self._lock = threading.Lock()
+
+    def delay(self, endpoint):
+        """Returns the seconds to wait before hedging a request, or None for never"""
+
+        with self._lock:
+            self._counts['requests'] += 1
+            samples = self._latencies.get(endpoint)
+            if samples is None or len(samples) < self.min_samples:
+                return None
+
+            ordered = sorted(samples)
+
+        rank = int(round(self.percentile / 100.0 * (len(ordered) - 1)))
+
+        return ordered[rank]
+
+    def observe(self, endpoint, seconds):
+        """Records the latency of a completed request"""
+
+        with self._lock:
+            samples = self._latencies.get(endpoint)
+            if samples is None:
+                samples = self._latencies[endpoint] = deque(maxlen=self.window)
+
+            samples.append(seconds)
+
+    def record(self, won):
+        """Records that a hedge was sent, and whether it answered first"""
+
+        with self._lock:
+            self._counts['hedged'] += 1
+            if won:
+                self._counts['hedge_wins'] += 1
+
+    def stats(self):
+        """Returns the counts of requests, hedges sent and hedges which won"""
+
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,198 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import multiprocessing
+import os
+import threading
+
+from Crypto.Hash import SHA256
+from Crypto.PublicKey import ECC, RSA
+from Crypto.Signature import DSS, PKCS1_v1_5, eddsa
+
+# Algorithm tags of the Authorization header, by signature scheme; every scheme signs
+# the SHA256 digest of the request
+RSA_SHA256 = 'SHA256'
+ED25519_SHA256 = 'ED25519-SHA256'
+ECDSA_SHA256 = 'ECDSA-SHA256'
+
+# Parsed private keys by filename, with the stat of the file they were parsed from
+_private_keys = {}
+_private_keys_lock = threading.Lock()
+
+def import_key(key_data):
+    """Returns the RSA or elliptic curve (Ed25519 or NIST P-curve) private key in key_data"""
+
+    try:
+        return RSA.importKey(key_data)
+    except ValueError:
+        return ECC.import_key(key_data)
+
+def export_key(private_key):
+    """Returns private_key PEM encoded, as import_key() reads it"""
+
+    if isinstance(private_key, RSA.RsaKey):
+        return private_key.exportKey('PEM')
+
+    return private_key.export_key(format='PEM')
+
+def key_algorithm(private_key):
+    """Returns the algorithm tag of signatures made with private_key"""
+
+    if isinstance(private_key, RSA.RsaKey):
+        return RSA_SHA256
+
+    if private_key.curve == 'Ed25519':
+        return ED25519_SHA256
+
+    if private_key.curve.startswith('NIST P-'):
+        return ECDSA_SHA256
+
+    raise ValueError('Unsupported private key curve: %s' % private_key.curve)
+
+class _DigestSigner(object):
+    """Signs the bytes of a hash object's digest, as Ed25519 signs messages"""
+
+    def __init__(self, signer):
+        self._signer = signer
+
+    def sign(self, digest):
+        return self._signer.sign(digest.digest())
+
+def new_signer(private_key):
+    """Returns an object whose sign() signs SHA256 hash objects with private_key"""
+
+    algorithm = key_algorithm(private_key)
+    if algorithm == RSA_SHA256:
+        return PKCS1_v1_5.new(private_key)
+
+    if algorithm == ED25519_SHA256:
+        return _DigestSigner(eddsa.new(private_key, 'rfc8032'))
+
+    # FIPS 186-3 draws a random nonce per signature; DSS is handed the hash object itself
+    # because it checks the hash OID
+    return DSS.new(private_key, 'fips-186-3')
+
+def load_private_key(filename):
+    """Returns the private key in the given file, parsing it only once
+
+    A key is parsed again if its file has been modified since."""
+
+    filename = os.path.abspath(filename)
+    stat = os.stat(filename)
+    key = (stat.st_mtime, stat.st_size, stat.st_ino)
+    with _private_keys_lock:
+        cached = _private_keys.get(filename)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    with open(filename, 'r') as file_:
+        private_key = import_key(file_.read())
+
+    with _private_keys_lock:
+        _private_keys[filename] = (key, private_key)
+
+    return private_key
+
+class LocalSigner(object):
+    """Signs digests on the calling thread with one reusable signer
+
+    RSA keys sign with PKCS#1 v1.5, Ed25519 keys with pure Ed25519 over the digest and
+    NIST curve keys with ECDSA; algorithm is the tag of the scheme in use."""
+
+    def __init__(self, private_key):
+        self.algorithm = key_algorithm(private_key)
+        self._signer = new_signer(private_key)
+
+    def sign(self, digest):
+        """Returns the signature of the given SHA256 hash object"""
+
+        return self._signer.sign(digest)
+
+    def close(self):
+        pass
+
+class _PrehashedSHA256(object):
+    """Stands in for a SHA256 hash object whose digest was computed elsewhere"""
+
+    oid = SHA256.new().oid
+    digest_size = SHA256.digest_size
+
+    def __init__(self, digest):
+        self._digest = digest
+
+    def digest(self):
+        return self._digest
+
+# The signer of the current worker process, created by _init_worker
+_worker_signer = None
+
+def _init_worker(key_data):
+    global _worker_signer
+    _worker_signer = new_signer(import_key(key_data))
+
+def _sign_in_worker(digest):
+    return _worker_signer.sign(_PrehashedSHA256(digest))
+
+class ProcessPoolSigner(object):
+    """Signs digests in a pool of worker processes
+
+    Only the 32 byte digest crosses the process boundary: request bodies are still
+    hashed by the caller. Each worker imports the key and builds its signer once. The
+    calling thread waits without holding the GIL, so many threads submitting requests
+    are signed in parallel on up to processes cores (default: all of them). The pool is
+    started on first use and again in a child process after a fork."""
+
+    def __init__(self, private_key, processes=None):
+        self.algorithm = key_algorithm(private_key)
+        self._key_data = export_key(private_key)
+        self.processes = processes
+        self._pool = None
+        self._pool_pid = None
+        self._pool_lock = threading.Lock()
+
+    def sign(self, digest):
+        """Returns the signature of the given SHA256 hash object"""
+
+        return self._get_pool().apply(_sign_in_worker, (digest.digest(),))
+
+    def close(self):
+        """Stops the worker processes; they are restarted by the next sign()"""
+
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.close()
+                self._pool.join()
+
+            self._pool = None
+            self._pool_pid = None
+
+    def _get_pool(self):
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = multiprocessing.Pool(self.processes, _init_worker,
+                                                      (self._key_data,))
+                    self._pool_pid = pid
+
+        return self._pool
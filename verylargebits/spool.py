@@ -0,0 +1,107 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import base64
+import hashlib
+import tempfile
+
+from verylargebits.upload import BufferFile, MappedFile
+
+# Spool defaults
+MAX_MEMORY_DEFAULT = 64 * 1024 * 1024
+READ_SIZE_DEFAULT = 1024 * 1024
+
+class Spool(object):
+    """Keeps a copy of a stream while hashing it, in memory up to max_memory bytes
+
+    Past max_memory the copy is moved to an unnamed temporary file in directory (by
+    default the system's) and the rest of the stream is written after it, so each byte
+    is read from the source once and written to disk at most once. mapped() then hands
+    the copy out for uploading without reading it back through Python."""
+
+    def __init__(self, max_memory=MAX_MEMORY_DEFAULT, directory=None):
+        self.max_memory = max_memory
+        self.directory = directory
+        self.size = 0
+        self._sha1 = hashlib.sha1()
+        self._buffer = bytearray()
+        self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def spilled(self):
+        """True if the copy is on disk"""
+
+        return self._file is not None
+
+    def write(self, data):
+        self._sha1.update(data)
+        self.size += len(data)
+        if self._file is None:
+            if len(self._buffer) + len(data) <= self.max_memory:
+                self._buffer += data
+                return
+
+            self._file = tempfile.TemporaryFile(dir=self.directory)
+            self._file.write(self._buffer)
+            self._buffer = None
+
+        self._file.write(data)
+
+    def fill(self, readable, read_size=READ_SIZE_DEFAULT):
+        """Copies everything left in readable (any object with read()) into the spool"""
+
+        while True:
+            data = readable.read(read_size)
+            if not data:
+                break
+
+            self.write(data)
+
+    def sha1(self):
+        """Returns the base64 encoded SHA1 hash of everything written, as calc_sha1 does"""
+
+        return base64.urlsafe_b64encode(self._sha1.digest()).decode('utf-8')
+
+    def mapped(self):
+        """Returns the copy as a MappedFile or BufferFile, which then owns it"""
+
+        if self._file is not None:
+            self._file.flush()
+            mapped, self._file = MappedFile(self._file), None
+        else:
+            mapped, self._buffer = BufferFile(self._buffer), None
+
+        return mapped
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        self._buffer = None
@@ -0,0 +1,202 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import hashlib
+import json
+import math
+import threading
+import time
+
+from verylargebits.body import _as_bytes
+from verylargebits.cache import SingleFlight, TTLCache
+
+# Template cache defaults
+MAX_ENTRIES_DEFAULT = 1024
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS templates (
+    hash TEXT PRIMARY KEY,
+    template_id TEXT NOT NULL,
+    used_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS templates_used ON templates (used_ns);
+'''
+
+class TemplateError(Exception):
+    """Raised when the service rejects a template"""
+
+    def __init__(self, message, response=None):
+        super(TemplateError, self).__init__(message)
+        self.response = response
+
+def _now_ns():
+    return int(time.time() * 1000 * 1000 * 1000)
+
+def _normalize(value):
+    if isinstance(value, dict):
+        return dict((key, _normalize(item)) for key, item in value.items())
+
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+
+    # 1.0 and 1 (and -0.0 and 0) are the same JSON number
+    if type(value) is float and not (math.isinf(value) or math.isnan(value)) \
+       and value == int(value):
+        return int(value)
+
+    return value
+
+def canonical_json(template):
+    """Returns the canonical encoding of a template: sorted keys, normalized numbers
+
+    template may be a JSON value or bytes already encoded as JSON. Documents which only
+    differ in key order, whitespace or number spelling encode the same."""
+
+    if isinstance(template, (bytes, bytearray, memoryview)):
+        template = json.loads(_as_bytes(template).decode('utf-8'))
+
+    return json.dumps(_normalize(template), sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False).encode('utf-8')
+
+def template_hash(template):
+    """Returns the hex SHA256 of the canonical encoding of a template"""
+
+    return hashlib.sha256(canonical_json(template)).hexdigest()
+
+class MemoryTemplateStore(TTLCache):
+    """An in-memory store of template ids evicting the least recently used entry
+
+    Entries never expire unless a ttl is given."""
+
+    def __init__(self, max_entries=MAX_ENTRIES_DEFAULT, ttl=None):
+        super(MemoryTemplateStore, self).__init__(float('inf') if ttl is None else ttl,
+                                                  max_entries)
+
+class DiskTemplateStore(object):
+    """A persistent SQLite store of template ids evicting the least recently used entry
+
+    The store may be shared by several threads and, serialized by SQLite, processes."""
+
+    def __init__(self, filename, max_entries=MAX_ENTRIES_DEFAULT):
+        # Imported here so that clients without a disk store never load sqlite3
+        import sqlite3
+
+        self.filename = filename
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        with self._db:
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM templates').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def get(self, key, default=None):
+        """Returns the template id stored under key, or default"""
+
+        with self._lock, self._db:
+            row = self._db.execute('SELECT template_id FROM templates WHERE hash = ?',
+                                   (key,)).fetchone()
+            if row is None:
+                return default
+
+            self._db.execute('UPDATE templates SET used_ns = ? WHERE hash = ?',
+                             (_now_ns(), key))
+
+        return row[0]
+
+    def set(self, key, template_id):
+        """Stores template_id under key, evicting the least recently used entries"""
+
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO templates VALUES (?, ?, ?)',
+                             (key, template_id, _now_ns()))
+            self._db.execute('DELETE FROM templates WHERE hash NOT IN'
+                             ' (SELECT hash FROM templates ORDER BY used_ns DESC LIMIT ?)',
+                             (self.max_entries,))
+
+    def pop(self, key, default=None):
+        with self._lock, self._db:
+            row = self._db.execute('SELECT template_id FROM templates WHERE hash = ?',
+                                   (key,)).fetchone()
+            self._db.execute('DELETE FROM templates WHERE hash = ?', (key,))
+
+        return default if row is None else row[0]
+
+    def clear(self):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM templates')
+
+class TemplateCache(object):
+    """Maps template documents to the ids of templates already created from them
+
+    Templates are keyed by template_hash(), so an equal document is only posted once;
+    concurrent posts of the same document are merged into one request. store is any
+    object with get/set/pop, such as a MemoryTemplateStore (the default) or a
+    DiskTemplateStore shared between runs."""
+
+    def __init__(self, client, store=None):
+        self.client = client
+        self.store = store if store is not None else MemoryTemplateStore()
+        self._flights = SingleFlight()
+
+    def ensure(self, template):
+        """Returns the id of a template created from the given document"""
+
+        key = template_hash(template)
+        template_id = self.store.get(key)
+        if template_id is None:
+            template_id = self._flights.do(key, lambda: self._create(key, template))
+
+        return template_id
+
+    def invalidate(self, template):
+        """Forgets the id of the given document, e.g. after its template was deleted"""
+
+        self.store.pop(template_hash(template))
+
+    def _create(self, key, template):
+        # A concurrent flight may have finished between the lookup and this one
+        template_id = self.store.get(key)
+        if template_id is not None:
+            return template_id
+
+        resp = self.client.post_template(template)
+        if resp.status_code != 200:
+            raise TemplateError('HTTP Error: %s' % resp, resp)
+
+        template_id = self.client.json(resp)['id']
+        self.store.set(key, template_id)
+
+        return template_id
@@ -0,0 +1,78 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connection import HTTPConnection, HTTPSConnection
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from verylargebits.metrics import current_trace
+
+class _TracedConnection(object):
+    def connect(self):
+        trace = current_trace()
+        if trace is None:
+            return super(_TracedConnection, self).connect()
+
+        start = time.time()
+        try:
+            return super(_TracedConnection, self).connect()
+        finally:
+            trace.connect += time.time() - start
+
+class _TracedPool(object):
+    def _get_conn(self, timeout=None):
+        trace = current_trace()
+        if trace is None:
+            return super(_TracedPool, self)._get_conn(timeout)
+
+        start = time.time()
+        try:
+            return super(_TracedPool, self)._get_conn(timeout)
+        finally:
+            trace.pool_wait += time.time() - start
+
+class TracedHTTPConnection(_TracedConnection, HTTPConnection):
+    pass
+
+class TracedHTTPSConnection(_TracedConnection, HTTPSConnection):
+    pass
+
+class TracedHTTPConnectionPool(_TracedPool, HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+class TracedHTTPSConnectionPool(_TracedPool, HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+class TracingAdapter(HTTPAdapter):
+    """An HTTPAdapter whose pools add pool waits and connection setup to the current Trace
+
+    Outside of a traced request the pools behave as urllib3's own."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(TracingAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TracedHTTPConnectionPool,
+            'https': TracedHTTPSConnectionPool,
+        }
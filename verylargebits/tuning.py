@@ -0,0 +1,199 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+
+# Patch size choice
+AUTO = 'auto'
+MIN_PATCH_SIZE = 256 * 1024
+MAX_PATCH_SIZE = 256 * 1024 * 1024
+PATCH_SIZE_STEP = 256 * 1024
+MEMORY_BUDGET_DEFAULT = 64 * 1024 * 1024
+
+# Link assumed before anything has been measured: 10MB/s
+BANDWIDTH_DEFAULT = 10 * 1024 * 1024
+
+# A patch should take at least this many round trips to send, so per-request latency
+# costs at most a quarter of its time, and at least MIN_PATCH_SECONDS
+PATCH_RTTS = 4
+MIN_PATCH_SECONDS = 1.0
+
+# Weight of a new measurement in the stored moving averages
+SMOOTHING = 0.3
+
+class LinkEstimate(object):
+    """Bandwidth (bytes per second) and round trip time (seconds) of a service link"""
+
+    def __init__(self, bandwidth, rtt):
+        self.bandwidth = bandwidth
+        self.rtt = rtt
+
+    def __repr__(self):
+        return '<LinkEstimate %.0fB/s %.3fs>' % (self.bandwidth, self.rtt)
+
+class ThroughputHistory(object):
+    """A JSON file of measured link estimates, one per service URL
+
+    New measurements are blended into the stored ones with an exponential moving
+    average, so one unusually fast or slow upload does not swing future patch sizes."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def estimate(self, service_url):
+        """Returns the stored LinkEstimate of the given service, or None"""
+
+        entry = self._load().get(service_url)
+        if entry is None:
+            return None
+
+        return LinkEstimate(entry['bandwidth'], entry['rtt'])
+
+    def record(self, service_url, bandwidth=None, rtt=None):
+        """Blends new measurements into the stored estimate of the given service"""
+
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(service_url, {})
+            for key, value in (('bandwidth', bandwidth), ('rtt', rtt)):
+                if value is None:
+                    continue
+
+                if key in entry:
+                    value = SMOOTHING * value + (1 - SMOOTHING) * entry[key]
+
+                entry[key] = value
+
+            entry.setdefault('bandwidth', BANDWIDTH_DEFAULT)
+            entry.setdefault('rtt', 0.0)
+            entry['updated'] = time.time()
+            entries[service_url] = entry
+            self._save(entries)
+
+    def _load(self):
+        try:
+            with open(self.filename) as file_:
+                return json.load(file_)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        # Write then rename so readers never see a partial file
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        file_, temp_filename = tempfile.mkstemp(dir=directory)
+        with os.fdopen(file_, 'w') as temp_file:
+            json.dump(entries, temp_file)
+
+        os.rename(temp_filename, self.filename)
+
+class UploadPlan(object):
+    """The patch size and concurrency chosen for an upload"""
+
+    def __init__(self, patch_size, max_in_flight, estimate):
+        self.patch_size = patch_size
+        self.max_in_flight = max_in_flight
+        self.estimate = estimate
+
+    def __repr__(self):
+        return '<UploadPlan %d x %d %r>' % (self.patch_size, self.max_in_flight, self.estimate)
+
+def plan_upload(file_size, estimate, memory_budget=MEMORY_BUDGET_DEFAULT, max_in_flight=16):
+    """Returns the UploadPlan maximising goodput for the given LinkEstimate
+
+    Patches are made long enough that their round trip is a small part of their
+    transfer time, but no longer, since a failed patch is sent again in full. Enough
+    patches are kept in flight to cover the bandwidth-delay product and the idle round
+    trip between patches, within memory_budget bytes of patch data."""
+
+    bandwidth = max(1.0, estimate.bandwidth)
+    patch_seconds = max(MIN_PATCH_SECONDS, PATCH_RTTS * estimate.rtt)
+    patch_size = _clamp(int(bandwidth * patch_seconds), MIN_PATCH_SIZE, MAX_PATCH_SIZE)
+
+    # Keep the link busy for the patch transfer plus its round trip
+    bdp = bandwidth * estimate.rtt
+    in_flight = int(math.ceil((bdp + patch_size) / float(patch_size))) + 1
+    in_flight = _clamp(in_flight, 1, max_in_flight)
+
+    # Fit the budget: fewer patches in flight first, then smaller patches
+    while in_flight > 2 and patch_size * in_flight > memory_budget:
+        in_flight -= 1
+
+    if patch_size * in_flight > memory_budget:
+        patch_size = max(MIN_PATCH_SIZE, memory_budget // in_flight)
+
+    # A small file is split so its patches still overlap, or sent in one request
+    if file_size < patch_size * in_flight:
+        patch_size = max(MIN_PATCH_SIZE, int(math.ceil(file_size / float(in_flight))))
+
+    if patch_size > PATCH_SIZE_STEP:
+        patch_size -= patch_size % PATCH_SIZE_STEP
+
+    return UploadPlan(patch_size, in_flight, estimate)
+
+def probe_rtt(client, sha1, probes=2):
+    """Returns the seconds taken by the fastest of probes asset status requests
+
+    The first request of a new client also opens its connection (and TLS session), so
+    on its own it would overstate the round trip."""
+
+    rtt = None
+    for _ in range(max(1, probes)):
+        start = time.time()
+        client.get_asset_status(sha1)
+        elapsed = time.time() - start
+        rtt = elapsed if rtt is None else min(rtt, elapsed)
+
+    return rtt
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+def plan_file_upload(client, filename, sha1, history=None, memory_budget=MEMORY_BUDGET_DEFAULT,
+                     max_in_flight=16, journal=None):
+    """Returns the UploadPlan for uploading filename with the given client
+
+    The round trip time is probed with two asset status requests; the bandwidth comes
+    from history, if any. An upload recorded in journal keeps its patch size so that it
+    can resume."""
+
+    rtt = probe_rtt(client, sha1)
+    estimate = history.estimate(client.service_url) if history is not None else None
+    if estimate is None:
+        estimate = LinkEstimate(BANDWIDTH_DEFAULT, rtt)
+    else:
+        estimate.rtt = rtt
+
+    if history is not None:
+        history.record(client.service_url, rtt=rtt)
+
+    plan = plan_upload(os.path.getsize(filename), estimate, memory_budget, max_in_flight)
+    if journal is not None:
+        plan.patch_size = journal.patch_size(sha1) or plan.patch_size
+
+    return plan
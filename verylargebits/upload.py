@@ -0,0 +1,291 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from concurrent.futures import ThreadPoolExecutor
+import math
+import mmap
+import os
+import threading
+import time
+
+from verylargebits.hashing import calc_sha1
+from verylargebits.journal import is_usable, usable_asset_id
+
+# Upload defaults
+PATCH_SIZE_DEFAULT = 4 * 1024 * 1024
+MAX_IN_FLIGHT_DEFAULT = 4
+
+class UploadError(Exception):
+    """Raised when the service rejects one of the patches of an upload"""
+
+    def __init__(self, message, response=None, patch_index=None):
+        super(UploadError, self).__init__(message)
+        self.response = response
+        self.patch_index = patch_index
+
+def calc_patch_count(file_size, patch_size):
+    """Returns the number of patches needed to send file_size bytes (at least one)"""
+
+    return max(1, int(math.ceil(float(file_size) / float(patch_size))))
+
+class MappedFile(object):
+    """A read-only memory map of a file which hands out patches as memoryview slices
+
+    Slices share the pages of the mapping, so hashing, signing and sending a patch never
+    copy it. Once a patch has been acknowledged release() tells the kernel its pages are
+    no longer needed, which keeps the resident size near the patches still in flight.
+
+    filename may also be an open file, which is then closed with the mapping."""
+
+    def __init__(self, filename):
+        self._file = filename if hasattr(filename, 'fileno') else open(filename, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self._view = memoryview(self._map)
+            except TypeError:
+                # Python 2 cannot view an mmap: patches are copied out of the mapping
+                self._view = self._map
+        else:
+            # Empty files cannot be mapped
+            self._map = None
+            self._view = memoryview(b'')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def patch(self, patch_index, patch_size):
+        """Returns a memoryview of the given patch"""
+
+        offset = patch_index * patch_size
+        data = self._view[offset:offset + patch_size]
+
+        return data if isinstance(data, memoryview) else memoryview(data)
+
+    def release(self, patch_index, patch_size):
+        """Drops the resident pages of the given patch, if the platform allows it"""
+
+        if self._map is None or not hasattr(self._map, 'madvise'):
+            return
+
+        # madvise() needs a page-aligned start; pages shared with the previous patch stay
+        start = -(-patch_index * patch_size // mmap.PAGESIZE) * mmap.PAGESIZE
+        end = min(self.size, (patch_index + 1) * patch_size)
+        if start < end:
+            self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def close(self):
+        self._view = None
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A caller still holds a slice (e.g. via UploadError.response.request);
+                # the mapping is unmapped when that reference goes away
+                pass
+
+            self._map = None
+
+        self._file.close()
+
+class BufferFile(object):
+    """Hands out patches of an in-memory buffer as memoryview slices, as MappedFile does"""
+
+    def __init__(self, buffer_):
+        self._view = memoryview(buffer_)
+        self.size = len(self._view)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def patch(self, patch_index, patch_size):
+        """Returns a memoryview of the given patch"""
+
+        offset = patch_index * patch_size
+
+        return self._view[offset:offset + patch_size]
+
+    def release(self, patch_index, patch_size):
+        pass
+
+    def close(self):
+        self._view = None
+
+class Uploader(object):
+    """Uploads a file as a POST of its first patch followed by concurrent PATCHes
+
+    The first patch creates the asset and returns its id, after which patches 1..N are
+    sent by a pool of max_in_flight workers. At most max_buffered_bytes of file data
+    (by default max_in_flight patches) is held in memory at any time: taking the next
+    patch waits until an earlier one has been acknowledged. The file is memory mapped
+    and patches are passed to the client as memoryview slices of the mapping.
+
+    progress, if given, is called from the worker threads as each patch is acknowledged
+    with the arguments (patch_index, patch_count, patch_bytes).
+
+    With an UploadJournal every acknowledged patch is recorded durably, and an upload of
+    the same file with the same patch size resumes by sending only the missing patches.
+    The record is removed once the service reports the asset USABLE."""
+
+    def __init__(self, client, patch_size=PATCH_SIZE_DEFAULT,
+                 max_in_flight=MAX_IN_FLIGHT_DEFAULT, max_buffered_bytes=None, progress=None):
+        if patch_size < 1:
+            raise ValueError('patch_size must be positive')
+
+        if max_in_flight < 1:
+            raise ValueError('max_in_flight must be positive')
+
+        self.client = client
+        self.patch_size = patch_size
+        self.max_in_flight = max_in_flight
+        self.max_buffered_bytes = max_buffered_bytes
+        self.progress = progress
+        self.sent_bytes = 0
+        self.elapsed = 0.0
+        self._sent_lock = threading.Lock()
+
+    def buffered_patch_limit(self):
+        """Returns how many patches may be held in memory at once"""
+
+        if self.max_buffered_bytes is None:
+            return self.max_in_flight
+
+        return max(1, min(self.max_in_flight, self.max_buffered_bytes // self.patch_size))
+
+    def upload(self, filename, sha1=None, journal=None):
+        """Uploads the given file and returns the new asset id"""
+
+        if sha1 is None:
+            sha1 = calc_sha1(filename)
+
+        return self.upload_mapped(MappedFile(filename), sha1, journal=journal)
+
+    def upload_mapped(self, mapped, sha1, journal=None):
+        """Uploads a MappedFile or BufferFile with the given hash and closes it"""
+
+        start = time.time()
+        with mapped:
+            patch_count = calc_patch_count(mapped.size, self.patch_size)
+            if journal is None:
+                asset_id = self._upload(mapped, sha1, patch_count, None)
+            else:
+                with journal.open(sha1, self.patch_size, patch_count) as entry:
+                    # Another process may have finished the upload while we waited
+                    asset_id = None
+                    if entry.waited and entry.asset_id is None:
+                        asset_id = usable_asset_id(self.client, sha1)
+
+                    if asset_id is not None:
+                        entry.remove()
+                    else:
+                        asset_id = self._upload(mapped, sha1, patch_count, entry)
+                        if is_usable(self.client, sha1):
+                            entry.remove()
+
+        self.elapsed = time.time() - start
+
+        return asset_id
+
+    def goodput(self):
+        """Returns the bytes per second acknowledged by the last upload, or None"""
+
+        if not self.sent_bytes or self.elapsed <= 0:
+            return None
+
+        return self.sent_bytes / self.elapsed
+
+    def _upload(self, mapped, sha1, patch_count, entry):
+        if entry is not None and entry.asset_id is not None:
+            asset_id = entry.asset_id
+        else:
+            data = mapped.patch(0, self.patch_size)
+            resp = self.client.post_asset(data, sha1, patch_count - 1)
+            if resp.status_code != 200:
+                raise UploadError('HTTP Error: %s' % resp, resp, 0)
+
+            asset_id = resp.json()['id']
+            if entry is not None:
+                entry.record_asset(asset_id)
+
+            self._report(0, patch_count, len(data))
+            mapped.release(0, self.patch_size)
+            del data, resp
+
+        if entry is not None:
+            patch_indexes = entry.missing()
+        else:
+            patch_indexes = range(1, patch_count)
+
+        if patch_indexes:
+            self._send_patches(mapped, asset_id, patch_count, patch_indexes, entry)
+
+        return asset_id
+
+    def _send_patches(self, mapped, asset_id, patch_count, patch_indexes, entry):
+        permits = threading.BoundedSemaphore(self.buffered_patch_limit())
+        errors = []
+
+        def send(patch_index, data):
+            try:
+                if errors:
+                    return
+
+                resp = self.client.patch_asset(asset_id, patch_index, data)
+                if resp.status_code != 200:
+                    errors.append(UploadError('HTTP Error: %s' % resp, resp, patch_index))
+                else:
+                    if entry is not None:
+                        entry.ack(patch_index)
+
+                    self._report(patch_index, patch_count, len(data))
+                    mapped.release(patch_index, self.patch_size)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                permits.release()
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            for patch_index in patch_indexes:
+                permits.acquire()
+                if errors:
+                    permits.release()
+                    break
+
+                executor.submit(send, patch_index, mapped.patch(patch_index, self.patch_size))
+
+        if errors:
+            raise errors[0]
+
+    def _report(self, patch_index, patch_count, patch_bytes):
+        with self._sent_lock:
+            self.sent_bytes += patch_bytes
+
+        if self.progress is not None:
+            self.progress(patch_index, patch_count, patch_bytes)
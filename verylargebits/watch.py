@@ -0,0 +1,214 @@
+# coding: utf-8
+
+"""Copyright(c) 2017, Very Large Bits LLC
+
+MIT License
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this
+software and associated documentation files (the "Software"), to deal in the Software
+without restriction, including without limitation the rights to use, copy, modify,
+merge, publish, distribute, sublicense, and/or sell copies of the Software, and to
+permit persons to whom the Software is furnished to do so, subject to the following
+conditions:
+
+The above copyright notice and this permission notice shall be included in all copies
+or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED,
+INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A
+PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT
+HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE."""
+
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import random
+import threading
+import time
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Watcher defaults
+FINAL_STATUSES_DEFAULT = ('DONE', 'ERROR')
+MIN_INTERVAL_DEFAULT = 1.0
+MAX_INTERVAL_DEFAULT = 30.0
+BACKOFF_DEFAULT = 1.5
+POLL_CONCURRENCY_DEFAULT = 4
+
+class RenderCompletion(object):
+    """A render which reached a final status, or which the watcher gave up on
+
+    status is None when the render did not finish within max_wait; response is the last
+    status response received, if any."""
+
+    def __init__(self, render_id, status, response=None):
+        self.render_id = render_id
+        self.status = status
+        self.response = response
+
+    def __repr__(self):
+        return '<RenderCompletion %s %s>' % (self.render_id, self.status)
+
+class _Watch(object):
+    def __init__(self, render_id, interval, deadline):
+        self.render_id = render_id
+        self.interval = interval
+        self.deadline = deadline
+        self.status = None
+        self.response = None
+
+class RenderWatcher(object):
+    """Tracks many renders from one scheduler thread until they reach a final status
+
+    Each render is polled with get_render_status, first after min_interval seconds. The
+    interval grows by backoff (with a little jitter) each time the status is unchanged,
+    up to max_interval, and drops back to min_interval when it changes. Polls are sent
+    by poll_concurrency worker threads over the client's pooled connections, so the
+    thread count and the number of requests in flight are fixed however many renders
+    are watched.
+
+    Completions are passed to callback (called from a worker thread) if one is given.
+    Otherwise they are put on the completed queue, which iterating the watcher reads,
+    yielding RenderCompletion objects until no watched render is outstanding. A
+    watcher with a callback keeps no completions, so its memory stays flat however
+    long it runs."""
+
+    def __init__(self, client, callback=None, final_statuses=FINAL_STATUSES_DEFAULT,
+                 min_interval=MIN_INTERVAL_DEFAULT, max_interval=MAX_INTERVAL_DEFAULT,
+                 backoff=BACKOFF_DEFAULT, poll_concurrency=POLL_CONCURRENCY_DEFAULT,
+                 max_wait=None):
+        self.client = client
+        self.callback = callback
+        self.final_statuses = frozenset(final_statuses)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_wait = max_wait
+        self.completed = queue.Queue()
+        self._schedule = []
+        self._outstanding = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=poll_concurrency)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __iter__(self):
+        if self.callback is not None:
+            raise ValueError('Completions are passed to the callback, not queued')
+
+        while True:
+            with self._condition:
+                while self._outstanding and self.completed.empty():
+                    self._condition.wait()
+
+                if self.completed.empty():
+                    return
+
+            yield self.completed.get()
+
+    def __len__(self):
+        """Returns the number of renders still being watched"""
+
+        with self._condition:
+            return self._outstanding
+
+    def add(self, render_id):
+        """Starts watching the given render"""
+
+        now = time.time()
+        deadline = None if self.max_wait is None else now + self.max_wait
+        watch = _Watch(render_id, self.min_interval, deadline)
+        with self._condition:
+            if self._closed:
+                raise ValueError('RenderWatcher is closed')
+
+            self._outstanding += 1
+            self._push(now + self.min_interval, watch)
+
+    def close(self):
+        """Stops polling; renders still outstanding are no longer reported"""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _push(self, when, watch):
+        # The id breaks ties between equal times so watches are never compared
+        heapq.heappush(self._schedule, (when, id(watch), watch))
+        self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    now = time.time()
+                    if self._schedule and self._schedule[0][0] <= now:
+                        break
+
+                    timeout = self._schedule[0][0] - now if self._schedule else None
+                    self._condition.wait(timeout)
+
+                if self._closed:
+                    return
+
+                _, _, watch = heapq.heappop(self._schedule)
+
+            self._executor.submit(self._poll, watch)
+
+    def _poll(self, watch):
+        try:
+            response = self.client.get_render_status(watch.render_id)
+            status = None
+            if response.status_code == 200:
+                status = self.client.json(response).get('status')
+        except Exception:
+            response, status = None, None
+
+        if status is not None and status in self.final_statuses:
+            self._complete(RenderCompletion(watch.render_id, status, response))
+            return
+
+        if response is not None:
+            watch.response = response
+
+        if watch.deadline is not None and time.time() >= watch.deadline:
+            self._complete(RenderCompletion(watch.render_id, None, watch.response))
+            return
+
+        if status is not None and status != watch.status:
+            watch.status = status
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(self.max_interval, watch.interval * self.backoff)
+
+        delay = watch.interval * random.uniform(0.9, 1.1)
+        with self._condition:
+            if not self._closed:
+                self._push(time.time() + delay, watch)
+
+    def _complete(self, completion):
+        # Queued and counted at once, so iterators see both or neither
+        with self._condition:
+            if self.callback is None:
+                self.completed.put(completion)
+
+            self._outstanding -= 1
+            self._condition.notify_all()
+
+        if self.callback is not None:
+            self.callback(completion)